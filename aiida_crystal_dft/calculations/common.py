@@ -3,16 +3,18 @@
 AiiDA CRYSTAL calculation plugin.
 Code shared between serial and parallel CRYSTAL calculations.
 """
+import os
 from abc import ABCMeta
 
 from ase.data import chemical_symbols
 from aiida.engine import CalcJob
-from aiida.orm import Dict, Code, StructureData, SinglefileData, TrajectoryData, Bool, Int
+from aiida.orm import Dict, Code, StructureData, SinglefileData, TrajectoryData, RemoteData, Bool, Int
 from aiida.common import CodeInfo, CalcInfo, InputValidationError
 from aiida_crystal_dft.io.d12 import D12
 from aiida_crystal_dft.io.f34 import Fort34
 from aiida_crystal_dft.data.basis import CrystalBasisData
 from aiida_crystal_dft.data.basis_family import CrystalBasisFamilyData
+from aiida_crystal_dft.data.wavefunction import CrystalRemoteWavefunctionData, available_codecs
 from aiida_crystal_dft.utils.electrons import guess_oxistates, guess_spinlock
 
 
@@ -27,6 +29,10 @@ class CrystalCommonCalculation(CalcJob, metaclass=ABCMeta):
     _GEOMETRY_FILE_NAME = 'fort.34'
     _OUTPUT_FILE_NAME = 'OUTPUT'
     _ERROR_FILE_NAME = '_scheduler-stderr.txt'
+    _WAVEFUNCTION_FILE_NAME = 'fort.9'
+    _GUESS_FILE_NAME = 'fort.20'
+    _ERROR_DIAGNOSTICS_FILE_NAME = 'fort.87'
+    _WAVEFUNCTION_INFO_FILE_NAME = 'fort.9.info'
     _BASIS_PREFIX = 'basis_'
 
     @classmethod
@@ -46,12 +52,15 @@ class CrystalCommonCalculation(CalcJob, metaclass=ABCMeta):
         spec.input('spinlock_steps', valid_type=Int, required=False, default=lambda: Int(5))
         spec.input_namespace('basis', valid_type=CrystalBasisData, required=False, dynamic=True)
         spec.input('basis_family', valid_type=CrystalBasisFamilyData, required=False)
+        spec.input('restart_folder', valid_type=RemoteData, required=False,
+                   help="Remote folder of a previous calculation on the same structure; its wave function "
+                        "is used as the SCF initial guess (GUESSP)")
 
         # output nodes
         spec.output('output_structure', valid_type=StructureData, required=False)
         spec.output('output_parameters', valid_type=Dict, required=True)
         spec.output('oxidation_states', valid_type=Dict, required=True)
-        spec.output('output_wavefunction', valid_type=SinglefileData, required=False)
+        spec.output('output_wavefunction', valid_type=(SinglefileData, CrystalRemoteWavefunctionData), required=False)
         spec.output('output_trajectory', valid_type=TrajectoryData, required=False)
         spec.default_output_node = 'output_parameters'
 
@@ -60,6 +69,18 @@ class CrystalCommonCalculation(CalcJob, metaclass=ABCMeta):
         spec.input('metadata.options.output_filename', valid_type=str, default=cls._OUTPUT_FILE_NAME)
         spec.input('metadata.options.scheduler_stderr', valid_type=str, default=cls._ERROR_FILE_NAME)
         spec.input('metadata.options.parser_name', valid_type=str, default='crystal_dft')
+        spec.input('metadata.options.remote_wavefunction', valid_type=bool, default=False,
+                   help="Leave fort.9 in the remote folder: it is not retrieved, and the output wavefunction is "
+                        "a reference to the remote file with the geometry and AO number taken from the output, "
+                        "and the size and checksum computed on the remote after the run")
+        spec.input('metadata.options.wavefunction_compression', valid_type=str, required=False,
+                   validator=cls._validate_wavefunction_compression,
+                   help="Compression codec of the output wavefunction stored in the repository "
+                        "(one of {}); the wavefunction is stored uncompressed if not set".format(
+                            ", ".join(available_codecs())))
+        spec.input('metadata.options.retrieve_wavefunction', valid_type=bool, required=False,
+                   help="Whether to retrieve fort.9 for the output wavefunction; by default it is not retrieved "
+                        "for phonon and elastic constants runs")
 
         # exit codes
         # 3xx - CRYSTAL errors
@@ -81,6 +102,13 @@ class CrystalCommonCalculation(CalcJob, metaclass=ABCMeta):
         # 4xx - other errors
         spec.exit_code(400, 'ERROR_UNKNOWN', message='Unknown error')
         spec.exit_code(401, 'ERROR_NO_RETRIEVED_FOLDER', message='The retrieved folder data node could not be accessed')
+        spec.exit_code(402, 'ERROR_NO_WAVEFUNCTION_METADATA',
+                       message='The wavefunction is left on the remote, but its metadata are not found in the output')
+
+    @classmethod
+    def _validate_wavefunction_compression(cls, value, _):
+        if value is not None and value not in available_codecs():
+            return "wavefunction_compression must be one of {}".format(", ".join(available_codecs()))
 
     def _validate_basis_input(self, inputdict):
         """Input validation; returns the dict of validated data"""
@@ -146,7 +174,11 @@ class CrystalCommonCalculation(CalcJob, metaclass=ABCMeta):
                 except NotImplementedError:
                     self.logger.info("is_magnetic is True for non-magnetic structure")
 
-            d12_file = D12(parameters=self.inputs.parameters.get_dict(), basis=basis_dict['basis_family'])
+            # start SCF from the density matrix of the previous calculation
+            if 'restart_folder' in self.inputs:
+                params['scf']['guessp'] = True
+
+            d12_file = D12(parameters=params, basis=basis_dict['basis_family'])
 
         except (AttributeError, ValueError, NotImplementedError) as err:
             raise InputValidationError(
@@ -166,6 +198,44 @@ class CrystalCommonCalculation(CalcJob, metaclass=ABCMeta):
         codeinfo.stdin_name = self.inputs.metadata.options.input_filename
         return codeinfo
 
+    def _optimises_geometry(self):
+        """Check if the geometry is optimised, either by itself or before phonon or elastic constants run"""
+        geometry = self.inputs.parameters.get_dict().get('geometry', {})
+        if geometry.get('optimise'):
+            return True
+        return any(isinstance(geometry.get(run), dict) and geometry[run].get('PREOPTGEOM')
+                   for run in ('phonons', 'elastic_constants'))
+
+    def _needs_wavefunction(self):
+        """Check if fort.9 should be retrieved: phonon and elastic constants runs need not, unless asked to"""
+        retrieve = self.inputs.metadata.options.get('retrieve_wavefunction', None)
+        if retrieve is not None:
+            return retrieve
+        geometry = self.inputs.parameters.get_dict().get('geometry', {})
+        return not (geometry.get('phonons') or geometry.get('elastic_constants'))
+
+    def _set_retrieve_lists(self, calcinfo, output_filename):
+        """
+        Sets the files to retrieve depending on the run type. The output and the error file are stored, fort.34 is
+        stored only for geometry optimisation, and fort.9 is retrieved only for parsing (the output wavefunction
+        node keeps its own copy). fort.9 left on the remote is not retrieved; instead, its size and MD5 checksum
+        are written by the job script to a small file retrieved for parsing. More files to store are set with
+        additional_retrieve_list option
+        """
+        calcinfo.retrieve_list = [output_filename, self._ERROR_DIAGNOSTICS_FILE_NAME]
+        calcinfo.retrieve_temporary_list = []
+        if self._optimises_geometry():
+            calcinfo.retrieve_list.append(self._GEOMETRY_FILE_NAME)
+        if not self._needs_wavefunction():
+            return
+        if self.inputs.metadata.options.remote_wavefunction:
+            calcinfo.append_text = ("if [ -f {0} ]; then wc -c < {0} > {1}; "
+                                    "md5sum {0} | cut -d ' ' -f 1 >> {1}; fi").format(
+                self._WAVEFUNCTION_FILE_NAME, self._WAVEFUNCTION_INFO_FILE_NAME)
+            calcinfo.retrieve_temporary_list.append(self._WAVEFUNCTION_INFO_FILE_NAME)
+        else:
+            calcinfo.retrieve_temporary_list.append(self._WAVEFUNCTION_FILE_NAME)
+
     def _prepare_calcinfo(self, codeinfo):
         # Prepare CalcInfo object for aiida
         calcinfo = CalcInfo()
@@ -173,4 +243,11 @@ class CrystalCommonCalculation(CalcJob, metaclass=ABCMeta):
         calcinfo.codes_info = [codeinfo]
         calcinfo.local_copy_list = []
         calcinfo.remote_copy_list = []
+        if 'restart_folder' in self.inputs:
+            # previous fort.9 becomes fort.20 read by GUESSP
+            restart_folder = self.inputs.restart_folder
+            calcinfo.remote_copy_list.append((restart_folder.computer.uuid,
+                                              os.path.join(restart_folder.get_remote_path(),
+                                                           self._WAVEFUNCTION_FILE_NAME),
+                                              self._GUESS_FILE_NAME))
         return calcinfo
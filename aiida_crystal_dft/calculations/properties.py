@@ -1,11 +1,13 @@
 """
 A plugin to create a properties files from CRYSTAL17 output
 """
+import os
 
 from aiida.common import CalcInfo, CodeInfo, InputValidationError
 from aiida.engine import CalcJob
-from aiida.orm import Dict, Code, SinglefileData, BandsData, ArrayData, StructureData
+from aiida.orm import Dict, Code, SinglefileData, RemoteData, BandsData, ArrayData, StructureData
 from aiida_crystal_dft.io.d3 import D3
+from aiida_crystal_dft.data.wavefunction import CrystalRemoteWavefunctionData, CrystalCompressedWavefunctionData
 
 
 class PropertiesCalculation(CalcJob):
@@ -16,6 +18,8 @@ class PropertiesCalculation(CalcJob):
     _OUTPUT_FILE_NAME = 'properties.out'
     _WAVEFUNCTION_FILE_NAME = 'fort.9'
     _PROPERTIES_FILE_NAME = 'fort.25'
+    # the ways of getting fort.9 to the working directory
+    _WAVEFUNCTION_TRANSFERS = ('repository', 'symlink', 'copy')
 
     @classmethod
     def define(cls, spec):
@@ -24,9 +28,12 @@ class PropertiesCalculation(CalcJob):
         super(PropertiesCalculation, cls).define(spec)
         # input nodes
         spec.input('code', valid_type=Code)
-        spec.input('wavefunction', valid_type=SinglefileData, required=True)
+        spec.input('wavefunction', valid_type=(SinglefileData, CrystalRemoteWavefunctionData), required=True)
         spec.input('parameters', valid_type=Dict, required=True)
         spec.input('structure', valid_type=StructureData, required=False)
+        spec.input('wavefunction_folder', valid_type=RemoteData, required=False,
+                   help="Remote folder containing the wavefunction; by default the remote folder of the "
+                        "calculation which has created the wavefunction")
         # output nodes
         spec.output('output_bands', valid_type=BandsData, required=False)
         spec.output('output_bands_down', valid_type=BandsData, required=False)
@@ -35,10 +42,37 @@ class PropertiesCalculation(CalcJob):
         spec.input('metadata.options.input_filename', valid_type=str, default=cls._INPUT_FILE_NAME)
         spec.input('metadata.options.output_filename', valid_type=str, default=cls._OUTPUT_FILE_NAME)
         spec.input('metadata.options.parser_name', valid_type=str, default='crystal_dft.properties')
+        spec.input('metadata.options.wavefunction_transfer', valid_type=str, default='repository',
+                   validator=cls._validate_wavefunction_transfer,
+                   help="Either 'repository' (upload fort.9 from AiiDA repository), or 'symlink' or 'copy' "
+                        "(use fort.9 in the remote folder if it is on the same computer)")
         # exit codes
         spec.exit_code(100, 'ERROR_NO_RETRIEVED_FOLDER',
                        message='The retrieved folder data node could not be accessed')
 
+    @classmethod
+    def _validate_wavefunction_transfer(cls, value, _):
+        if value not in cls._WAVEFUNCTION_TRANSFERS:
+            return "wavefunction_transfer must be one of {}".format(", ".join(cls._WAVEFUNCTION_TRANSFERS))
+
+    def _get_wavefunction_folder(self):
+        """Returns the remote folder with fort.9 on the calculation computer, or None if there is no such folder"""
+        if isinstance(self.inputs.wavefunction, CrystalRemoteWavefunctionData):
+            remote_folder = self.inputs.wavefunction
+        elif 'wavefunction_folder' in self.inputs:
+            remote_folder = self.inputs.wavefunction_folder
+        else:
+            creator = self.inputs.wavefunction.creator
+            if creator is None or 'remote_folder' not in creator.outputs:
+                return None
+            remote_folder = creator.outputs.remote_folder
+        if remote_folder.computer.uuid != self.node.computer.uuid:
+            return None
+        # the folder might have been cleaned by the workchain which has created the wavefunction
+        if remote_folder.get_extra(RemoteData.KEY_EXTRA_CLEANED, False):
+            return None
+        return remote_folder
+
     def prepare_for_submission(self, folder):
         """
         Create input files.
@@ -57,9 +91,31 @@ class PropertiesCalculation(CalcJob):
         with folder.open(self._INPUT_FILE_NAME, "w") as f:
             d3_content.write(f)
 
-        # create input files: fort.9
-        with self.inputs.wavefunction.open(mode="rb") as f:
-            folder.create_file_from_filelike(f, self._WAVEFUNCTION_FILE_NAME, mode="wb")
+        # create input files: fort.9, taking it from the remote folder if possible
+        remote_wavefunction = []
+        transfer = self.inputs.metadata.options.wavefunction_transfer
+        if isinstance(self.inputs.wavefunction, CrystalRemoteWavefunctionData):
+            # there is no repository copy to fall back to
+            if self._get_wavefunction_folder() is None:
+                raise InputValidationError("The remote wavefunction must be on the calculation computer")
+            if transfer == 'repository':
+                transfer = 'symlink'
+        remote_folder = self._get_wavefunction_folder() if transfer != 'repository' else None
+        if remote_folder is not None:
+            remote_path = remote_folder.path if isinstance(remote_folder, CrystalRemoteWavefunctionData) else \
+                os.path.join(remote_folder.get_remote_path(), self._WAVEFUNCTION_FILE_NAME)
+            remote_wavefunction.append((remote_folder.computer.uuid, remote_path, self._WAVEFUNCTION_FILE_NAME))
+        else:
+            if transfer != 'repository':
+                self.logger.warning("Remote folder with the wavefunction not found on the calculation computer, "
+                                    "uploading the wavefunction from the repository")
+            # compressed wavefunction is decompressed by chunks on the way to the sandbox
+            if isinstance(self.inputs.wavefunction, CrystalCompressedWavefunctionData):
+                wavefunction = self.inputs.wavefunction.open_uncompressed()
+            else:
+                wavefunction = self.inputs.wavefunction.open(mode="rb")
+            with wavefunction as f:
+                folder.create_file_from_filelike(f, self._WAVEFUNCTION_FILE_NAME, mode="wb")
 
         # Prepare CodeInfo object for aiida
         codeinfo = CodeInfo()
@@ -73,7 +129,8 @@ class PropertiesCalculation(CalcJob):
         calcinfo.uuid = self.uuid
         calcinfo.codes_info = [codeinfo]
         calcinfo.local_copy_list = []
-        calcinfo.remote_copy_list = []
+        calcinfo.remote_copy_list = remote_wavefunction if transfer == 'copy' else []
+        calcinfo.remote_symlink_list = remote_wavefunction if transfer == 'symlink' else []
         calcinfo.retrieve_list = [self._PROPERTIES_FILE_NAME]
         calcinfo.local_copy_list = []
 
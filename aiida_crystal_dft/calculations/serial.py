@@ -16,11 +16,6 @@ class CrystalSerialCalculation(CrystalCommonCalculation):
             :param folder: aiida.common.folders.Folder subclass where
                 the plugin should put all its files.
         """
-        retrieve_list = [
-            self._GEOMETRY_FILE_NAME,
-            self.inputs.metadata.options.output_filename,
-            'fort.9',
-            'fort.87']
         # write input files
         self._prepare_input_files(folder)
 
@@ -32,6 +27,6 @@ class CrystalSerialCalculation(CrystalCommonCalculation):
 
         # Prepare CalcInfo object for aiida
         calcinfo = self._prepare_calcinfo(codeinfo)
-        calcinfo.retrieve_list = retrieve_list
+        self._set_retrieve_lists(calcinfo, self.inputs.metadata.options.output_filename)
 
         return calcinfo
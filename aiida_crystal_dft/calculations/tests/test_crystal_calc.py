@@ -38,8 +38,52 @@ def test_prepare_for_submission(crystal_calc_inputs):
     crystal_calc = CalculationFactory("crystal_dft.parallel")(crystal_calc_inputs)
     with SandboxFolder() as folder:
         calc_info = crystal_calc.prepare_for_submission(folder=folder)
-    assert crystal_calc._GEOMETRY_FILE_NAME in calc_info['retrieve_list']
     assert crystal_calc._OUTPUT_FILE_NAME in calc_info['retrieve_list']
+    # single point run: fort.34 is not needed, fort.9 is only parsed
+    assert crystal_calc._GEOMETRY_FILE_NAME not in calc_info['retrieve_list']
+    assert calc_info['retrieve_temporary_list'] == [crystal_calc._WAVEFUNCTION_FILE_NAME]
+
+
+def test_retrieve_lists(crystal_calc_inputs):
+    from aiida.common.folders import SandboxFolder
+    from aiida.orm import Dict
+    from aiida.plugins import CalculationFactory
+    parameters = crystal_calc_inputs.parameters.get_dict()
+    crystal_calc_inputs.parameters = Dict(dict=dict(parameters, geometry={'optimise': True}))
+    crystal_calc = CalculationFactory("crystal_dft.serial")(crystal_calc_inputs)
+    with SandboxFolder() as folder:
+        calc_info = crystal_calc.prepare_for_submission(folder=folder)
+    assert calc_info['retrieve_list'] == [crystal_calc._OUTPUT_FILE_NAME, 'fort.87', crystal_calc._GEOMETRY_FILE_NAME]
+    assert calc_info['retrieve_temporary_list'] == [crystal_calc._WAVEFUNCTION_FILE_NAME]
+    # phonons run does not need the wavefunction unless asked to
+    crystal_calc_inputs.parameters = Dict(dict=dict(parameters, geometry={'phonons': {'info_print': ['IR']}}))
+    crystal_calc = CalculationFactory("crystal_dft.serial")(crystal_calc_inputs)
+    with SandboxFolder() as folder:
+        calc_info = crystal_calc.prepare_for_submission(folder=folder)
+    assert calc_info['retrieve_list'] == [crystal_calc._OUTPUT_FILE_NAME, 'fort.87']
+    assert not calc_info['retrieve_temporary_list']
+    crystal_calc_inputs.metadata.options['retrieve_wavefunction'] = True
+    crystal_calc = CalculationFactory("crystal_dft.serial")(crystal_calc_inputs)
+    with SandboxFolder() as folder:
+        calc_info = crystal_calc.prepare_for_submission(folder=folder)
+    assert calc_info['retrieve_temporary_list'] == [crystal_calc._WAVEFUNCTION_FILE_NAME]
+
+
+def test_prepare_for_submission_restart(crystal_calc_inputs, tmpdir):
+    import os
+    from aiida.common.folders import SandboxFolder
+    from aiida.orm import RemoteData
+    from aiida.plugins import CalculationFactory
+    restart_folder = RemoteData(remote_path=str(tmpdir), computer=crystal_calc_inputs.code.computer)
+    crystal_calc_inputs.restart_folder = restart_folder
+    crystal_calc = CalculationFactory("crystal_dft.parallel")(crystal_calc_inputs)
+    with SandboxFolder() as folder:
+        calc_info = crystal_calc.prepare_for_submission(folder=folder)
+        with folder.open(crystal_calc._INPUT_FILE_NAME) as f:
+            d12 = f.read().split('\n')
+    assert calc_info.remote_copy_list == [(restart_folder.computer.uuid, os.path.join(str(tmpdir), 'fort.9'),
+                                           'fort.20')]
+    assert 'GUESSP' in d12
 
 
 def test_run_crystal_calculation(crystal_calc_inputs):
@@ -50,4 +50,51 @@ CRYSTAL RUN
 4 4 4  4 2 6
 4 2 6  4 0 4
 END
-"""
\ No newline at end of file
+"""
+
+
+def test_submit_remote_wavefunction(properties_calc_inputs, tmpdir):
+    import os
+    from aiida.common.folders import SandboxFolder
+    from aiida.orm import RemoteData
+    from aiida.plugins import CalculationFactory
+    remote_folder = RemoteData(remote_path=str(tmpdir), computer=properties_calc_inputs.code.computer)
+    properties_calc_inputs.wavefunction_folder = remote_folder
+    properties_calc_inputs.metadata.options['wavefunction_transfer'] = 'symlink'
+    properties_calc = CalculationFactory("crystal_dft.properties")(properties_calc_inputs)
+    with SandboxFolder() as folder:
+        calc_info = properties_calc.prepare_for_submission(folder=folder)
+        assert properties_calc._WAVEFUNCTION_FILE_NAME not in folder.get_content_list()
+    assert calc_info.remote_symlink_list == [(remote_folder.computer.uuid, os.path.join(str(tmpdir), 'fort.9'),
+                                              'fort.9')]
+    assert not calc_info.remote_copy_list
+
+
+def test_submit_compressed_wavefunction(properties_calc_inputs):
+    from aiida.common.folders import SandboxFolder
+    from aiida.plugins import CalculationFactory, DataFactory
+    with properties_calc_inputs.wavefunction.open(mode='rb') as f:
+        content = f.read()
+        f.seek(0)
+        properties_calc_inputs.wavefunction = DataFactory('crystal_dft.wavefunction.compressed').from_file(f)
+    properties_calc = CalculationFactory("crystal_dft.properties")(properties_calc_inputs)
+    with SandboxFolder() as folder:
+        properties_calc.prepare_for_submission(folder=folder)
+        with folder.open(properties_calc._WAVEFUNCTION_FILE_NAME, 'rb') as f:
+            assert f.read() == content
+
+
+def test_submit_cleaned_wavefunction_folder(properties_calc_inputs, tmpdir):
+    from aiida.common.folders import SandboxFolder
+    from aiida.orm import RemoteData
+    from aiida.plugins import CalculationFactory
+    remote_folder = RemoteData(remote_path=str(tmpdir), computer=properties_calc_inputs.code.computer).store()
+    remote_folder.set_extra(RemoteData.KEY_EXTRA_CLEANED, True)
+    properties_calc_inputs.wavefunction_folder = remote_folder
+    properties_calc_inputs.metadata.options['wavefunction_transfer'] = 'copy'
+    properties_calc = CalculationFactory("crystal_dft.properties")(properties_calc_inputs)
+    with SandboxFolder() as folder:
+        calc_info = properties_calc.prepare_for_submission(folder=folder)
+        # the wavefunction is uploaded from the repository instead
+        assert properties_calc._WAVEFUNCTION_FILE_NAME in folder.get_content_list()
+    assert not calc_info.remote_copy_list
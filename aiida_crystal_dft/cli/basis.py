@@ -1,5 +1,6 @@
 #  Copyright (c)  Andrey Sobolev, 2019. Distributed under MIT license, see LICENSE file.
 
+import time
 import click
 import tabulate
 from click_spinner import spinner as cli_spinner
@@ -18,21 +19,26 @@ def basis_set():
 @click.option('--ext', default="basis", help="the file extension to filter by")
 @options.FAMILY_NAME()
 @options.DESCRIPTION()
-def uploadfamily(path, ext, name, description):
+@click.option('--processes', type=int, default=None, help="the number of processes parsing basis files")
+def uploadfamily(path, ext, name, description, processes):
     """Upload a family of CRYSTAL Basis Set files."""
     basis_family_cls = get_data_class('crystal_dft.basis_family')
+    start = time.perf_counter()
     with cli_spinner():
         nfiles, created, uploaded = basis_family_cls.upload(
             name,
             path,
             extension=".{}".format(ext),
-            description=description
+            description=description,
+            processes=processes
             )
+    elapsed = time.perf_counter() - start
 
     msg = 'Basis set files found: {}, out of them uploaded: {}'.format(nfiles, len(uploaded))
     if uploaded:
         msg += ' (for elements: {})'.format(', '.join(sorted(list(uploaded))))
     msg += ' to {}basis family {}'.format('newly created ' if created else '', name)
+    msg += ' in {:.2f} s'.format(elapsed)
     click.echo(msg)
 
 
@@ -0,0 +1,44 @@
+#  Copyright (c)  Andrey Sobolev, 2020. Distributed under MIT license, see LICENSE file.
+
+import json
+import click
+from aiida.cmdline.groups import VerdiCommandGroup
+from aiida.cmdline.params import arguments, types
+from aiida.cmdline.params import options as aiida_options
+from aiida_crystal_dft.cli import options
+
+
+@click.group('crystal-dft-batch', cls=VerdiCommandGroup)
+@aiida_options.PROFILE(type=types.ProfileParamType(load_profile=True), expose_value=False)
+def batch():
+    """CLI for submitting Crystal calculations in batches"""
+
+
+@batch.command('submit')
+@arguments.DATA('structures')
+@aiida_options.GROUP(required=False, help='A group of structures to submit (in addition to the listed ones)')
+@aiida_options.CODE(required=True)
+@click.option('--parameters', type=click.File(), required=True, help='JSON file with calculation parameters')
+@click.option('--options', 'calc_options', type=click.File(), required=True, help='JSON file with calculation options')
+@click.option('--basis-family', required=True, help='Name of the basis family')
+@click.option('--chunk-size', type=int, default=100, show_default=True, help='Workchains submitted at once')
+@click.option('--max-active', type=click.IntRange(min=1), default=None, help='Maximum number of active workchains')
+@click.option('--sleep', type=float, default=0., show_default=True, help='Pause between chunks, in seconds')
+@options.DRY_RUN(help='validate inputs and deduplicate structures without submitting')
+def submit_batch(structures, group, code, parameters, calc_options, basis_family, chunk_size, max_active, sleep,
+                 dry_run):
+    """Submit BaseCrystalWorkChain for each of the unique STRUCTURES with shared inputs."""
+    from aiida.orm import StructureData
+    from aiida_crystal_dft.workflows.batch import submit_batch as submit
+    structures = list(structures)
+    if group is not None:
+        structures += [node for node in group.nodes if isinstance(node, StructureData)]
+    if not structures:
+        raise click.UsageError('No structures given')
+    report = submit(structures, code, json.load(parameters), basis_family, json.load(calc_options),
+                    chunk_size=chunk_size, max_active=max_active, sleep=sleep, dry_run=dry_run)
+    click.echo('Structures: {}, duplicates: {}, submitted: {}'.format(
+        report.structures, len(report.duplicates), len(report.submitted)))
+    for stage, elapsed in report.timings.items():
+        click.echo('{:<15} {:.2f} s'.format(stage, elapsed))
+    click.echo('Throughput: {:.2f} submissions/s'.format(report.throughput))
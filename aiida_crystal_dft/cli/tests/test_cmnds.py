@@ -23,6 +23,7 @@ def test_upload_to_basis_family(aiida_profile):
     result1 = runner.invoke(basis_set, [
         'uploadfamily', '--path', path, '--name', 'TEST'])
     assert result1.exit_code == 0
+    assert 'Basis set files found: 4' in result1.output
     result2 = runner.invoke(basis_set, [
         'listfamilies'])
     assert "TEST" in result2.stdout
@@ -32,3 +33,20 @@ def test_upload_to_basis_family(aiida_profile):
     result4 = runner.invoke(basis_set, [
         'listfamilies', '-e', 'U'])
     assert "No Basis Set family contains all given elements and symbols" in result4.stdout
+
+
+def test_submit_batch_dry_run(aiida_profile, mock_crystal_code, test_structure_data, tmp_path):
+    import json
+    test_structure_data.store()
+    parameters = tmp_path / 'parameters.json'
+    parameters.write_text(json.dumps({'scf': {'k_points': [8, 8]}}))
+    options = tmp_path / 'options.json'
+    options.write_text(json.dumps({'resources': {'num_machines': 1, 'num_mpiprocs_per_machine': 1}}))
+    from aiida_crystal_dft.cli.batch import batch
+    runner = CliRunner()
+    result = runner.invoke(batch, [
+        'submit', str(test_structure_data.pk), str(test_structure_data.pk), '--code', str(mock_crystal_code.pk),
+        '--parameters', str(parameters), '--options', str(options), '--basis-family', 'STO-3G', '--dry-run'])
+    assert result.exit_code == 0, result.output
+    assert 'Structures: 2, duplicates: 1, submitted: 0' in result.output
+    assert 'Throughput' in result.output
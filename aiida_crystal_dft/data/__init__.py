@@ -6,4 +6,5 @@ Register data types via the "aiida.data" entry point in setup.json.
 
 """
 from aiida_crystal_dft.data.basis import CrystalBasisData
-from aiida_crystal_dft.data.basis_family import CrystalBasisFamilyData
\ No newline at end of file
+from aiida_crystal_dft.data.basis_family import CrystalBasisFamilyData
+from aiida_crystal_dft.data.wavefunction import CrystalRemoteWavefunctionData, CrystalCompressedWavefunctionData
@@ -25,6 +25,20 @@ def md5(d, enc='utf-8'):
     return md5_func(json.dumps(d).encode(enc)).hexdigest()
 
 
+def read_basis_file(file_name):
+    """
+    Parses the basis set file
+    :param file_name: The name of the file containing the basis
+    :return: basis set dictionary
+    """
+    with open(file_name, 'r') as f:
+        try:
+            return gto_basis_parser().parseString(f.read()).asDict()
+        except ParseException as ex:
+            raise Exception("Parsing of {} failed: {} (at line:{}, col:{})".format(
+                file_name, ex.msg, ex.lineno, ex.col))
+
+
 class CrystalBasisData(Dict):
     """
     a data type to store CRYSTAL basis sets in ParameterData format
@@ -74,6 +88,17 @@ class CrystalBasisData(Dict):
         qb.append(cls, filters={'attributes.md5': {'==': checksum}})
         return [_ for [_] in qb.all()]
 
+    @classmethod
+    def from_md5_list(cls, checksums):
+        """
+        Return a dictionary of Basis Sets matching the given MD5 hashes (found with a single query),
+        with hashes as keys
+        """
+        from aiida.orm.querybuilder import QueryBuilder
+        qb = QueryBuilder()
+        qb.append(cls, filters={'attributes.md5': {'in': list(set(checksums))}})
+        return {basis.md5: basis for [basis] in qb.all()}
+
     @classmethod
     def from_file(cls, file_name):
         """Reads in the basis from file and checks if the same basis is already present in the DB.
@@ -82,17 +107,37 @@ class CrystalBasisData(Dict):
         :param file_name: The name of the file containing the basis
         :return: Class instance
         """
-        with open(file_name, 'r') as f:
-            try:
-                basis = gto_basis_parser().parseString(f.read())
-            except ParseException as ex:
-                raise Exception("Parsing of {} failed: {} (at line:{}, col:{})".format(
-                    file_name, ex.msg, ex.lineno, ex.col))
-        md5_hash = md5(basis.asDict())
+        basis = read_basis_file(file_name)
+        md5_hash = md5(basis)
         bases = cls.from_md5(md5_hash)
         if bases:
             return bases[0]
-        return cls(dict=basis.asDict()).store()
+        return cls(dict=basis).store()
+
+    @classmethod
+    def from_files(cls, file_names, processes=None):
+        """The bulk version of from_file. Files are parsed in a process pool, the existing basis sets are found
+        with a single query, and the new ones are stored in a single transaction.
+
+        :param file_names: The names of the files containing the bases
+        :param processes: The number of processes used for parsing (the number of CPUs by default)
+        :return: a list of class instances in the order of file names
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from aiida.manage import get_manager
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            basis_dicts = list(executor.map(read_basis_file, file_names))
+        md5_hashes = [md5(basis) for basis in basis_dicts]
+        bases = cls.from_md5_list(md5_hashes)
+        new_bases = []
+        for basis, md5_hash in zip(basis_dicts, md5_hashes):
+            if md5_hash not in bases:
+                bases[md5_hash] = cls(dict=basis)
+                new_bases.append(bases[md5_hash])
+        with get_manager().get_profile_storage().transaction():
+            for basis in new_bases:
+                basis.store(check_uniqueness=False)
+        return [bases[md5_hash] for md5_hash in md5_hashes]
 
     def set_oxistate(self, oxi_state, high_spin_preferred=False):
         """Set oxidation state for the basis"""
@@ -117,12 +162,14 @@ class CrystalBasisData(Dict):
                     basis_dict["bs"][i][0][3] = o
         return basis_dict
 
-    def store(self):
+    def store(self, check_uniqueness=True):
+        """Stores the basis set; check_uniqueness=False skips the query for the same basis set in DB
+        (used when the uniqueness has already been checked in bulk)"""
         # check if the dictionary has needed keys (may be it's incomplete?)
         if ("header" not in self.get_dict()) or ("bs" not in self.get_dict()):
             raise ValueError("Basis set for element {} does not contain required keys".format(self.element))
         md5_hash = md5(self.get_dict())
-        if self.from_md5(md5_hash):
+        if check_uniqueness and self.from_md5(md5_hash):
             raise UniquenessError("Basis with MD5 hash {} has already found in the database!".format(md5_hash))
         self.set_attribute("md5", md5_hash)
         return super(CrystalBasisData, self).store()
@@ -32,8 +32,15 @@ class CrystalBasisFamilyData(Data):
         super(CrystalBasisFamilyData, self).__init__(**kwargs)
         if name is not None:
             self.set_name(name)
+
+    def initialize(self):
+        """Called both for the new instances and for the ones loaded from the database"""
+        super(CrystalBasisFamilyData, self).initialize()
         self.structure = None
         self.oxi_states = None
+        # the group is found once per instance; the element index is built on first use
+        self._group = None
+        self._bases = None
 
     @classmethod
     def _get(cls, name=None):
@@ -72,9 +79,6 @@ class CrystalBasisFamilyData(Data):
 
     def add(self, basis_sets):
         """Adds basis sets to family"""
-        group, group_created = Group.objects.get_or_create(label=self.name,
-                                                           type_string=BASIS_FAMILY_TYPE,
-                                                           user=get_automatic_user())
         # validate basis sets
         if not all([isinstance(basis, CrystalBasisData) for basis in basis_sets]):
             raise TypeError('Basis sets not of type CrystalBasisData can not be added to basis family {}'.
@@ -85,29 +89,42 @@ class CrystalBasisFamilyData(Data):
             raise ValueError("Trying to add more than one basis set for element(s): {} to basis family {}".
                              format(", ".join(several_bases), self.name))
         # check for element uniqueness within the existent group
-        if not group_created:
-            elements_in_group = set([basis.element for basis in group.nodes])
-            elements_to_add = set(elements).difference(elements_in_group)
-        else:
-            elements_to_add = set(elements)
-        group.add_nodes([basis for basis in basis_sets if basis.element in elements_to_add])
+        elements_to_add = set(elements).difference(self.element_index)
+        bases_to_add = [basis for basis in basis_sets if basis.element in elements_to_add]
+        self.group.add_nodes(bases_to_add)
+        self._bases.update({basis.element: basis for basis in bases_to_add})
         return elements_to_add
 
     def get_basis(self, element):
         """If basis family is not predefined, return the basis set corresponding to element"""
         if self.predefined:
             raise TypeError('Cannot retrieve basis sets from predefined basis family')
-        for basis in self.group.nodes:
-            if basis.element == element:
-                return basis
-        raise ValueError('No basis for element {} found in family {}'.format(element, self.name))
+        try:
+            return self.element_index[element]
+        except KeyError:
+            raise ValueError('No basis for element {} found in family {}'.format(element, self.name))
 
     @property
     def group(self):
-        _group, _ = Group.objects.get_or_create(label=self.name,
-                                                type_string=BASIS_FAMILY_TYPE,
-                                                user=get_automatic_user())
-        return _group
+        if self._group is None:
+            self._group, _ = Group.objects.get_or_create(label=self.name,
+                                                         type_string=BASIS_FAMILY_TYPE,
+                                                         user=get_automatic_user())
+        return self._group
+
+    @property
+    def element_index(self):
+        """The index of basis sets in the family with elements as keys, built with a single query"""
+        if self._bases is None:
+            from aiida.orm.querybuilder import QueryBuilder
+            qb = QueryBuilder()
+            qb.append(Group, filters={'id': self.group.pk}, tag='group')
+            qb.append(CrystalBasisData, with_group='group',
+                      project=['*', 'attributes.header', 'attributes.ecp'])
+            # the element is found from the attributes, the same way CrystalBasisData.element does it
+            self._bases = {chemical_symbols[header[0] - (200 if ecp is not None else 0)]: basis
+                           for basis, header, ecp in qb.all()}
+        return self._bases
 
     @property
     def name(self):
@@ -133,10 +150,9 @@ class CrystalBasisFamilyData(Data):
         if not self.predefined:
             # check if all elements have their bases in the family
             composition = structure.get_composition()
-            elements_in_group = set([basis.element for basis in self.group.nodes])
-            if not all([el in elements_in_group for el in composition]):
+            if not all([el in self.element_index for el in composition]):
                 raise ValueError('Basis sets for some elements present in the structure not found in family: {}'.format(
-                    ",".join(list(set(composition).difference(elements_in_group)))))
+                    ",".join(list(set(composition).difference(self.element_index)))))
             self.oxi_states = {el: 0. for el in composition}
         self.structure = structure
 
@@ -196,13 +212,14 @@ class CrystalBasisFamilyData(Data):
         return created
 
     @classmethod
-    def upload(cls, name, path, extension='basis', description=None):
+    def upload(cls, name, path, extension='basis', description=None, processes=None):
         """
-        Upload a basis family
+        Upload a basis family. Basis files are parsed in parallel, and the new basis sets are stored in bulk
         :param name: a name of the basis family (should not coincide with predefined)
         :param path: a path with basis files
         :param extension: a extension of basis files
         :param description: an (optional) description of basis family
+        :param processes: a number of processes used to parse basis files (the number of CPUs by default)
         :return: numbers of files found; flag showing if group is created; the set of elements for which a basis set
         was uploaded
         """
@@ -214,7 +231,7 @@ class CrystalBasisFamilyData(Data):
             if (os.path.isfile(os.path.join(path, i))
                 and i.lower().endswith(extension))
         ]
-        bases = [CrystalBasisData.from_file(file_name) for file_name in files]
+        bases = CrystalBasisData.from_files(files, processes=processes)
         group, created = cls.get_or_create(name)
         if description is not None:
             group.description = description
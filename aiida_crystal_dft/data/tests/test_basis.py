@@ -90,6 +90,19 @@ def test_special_cases(aiida_profile):
     assert basis.set_oxistate(-2)
 
 
+def test_from_files(aiida_profile):
+    from aiida_crystal_dft.data.basis import CrystalBasisData
+    root_dir = os.path.join(TEST_DIR, "input_files", "311g_ae")
+    file_names = [os.path.join(root_dir, f) for f in sorted(os.listdir(root_dir))]
+    # one basis set is already in the database
+    existing = CrystalBasisData.from_file(file_names[0])
+    bases = CrystalBasisData.from_files(file_names, processes=2)
+    assert [basis.element for basis in bases] == ["F", "K", "Mn"]
+    assert all(basis.is_stored for basis in bases)
+    assert bases[0].uuid == existing.uuid
+    assert [basis.uuid for basis in CrystalBasisData.from_files(file_names)] == [basis.uuid for basis in bases]
+
+
 def test_get_valence_orbitals():
     from aiida_crystal_dft.data.basis import get_valence_orbitals as func
     assert func({'s': [], 'sp': [8.0, 1.0, 0.0], 'd': [10.0, 0.0], 'f': [], 'g': []}) == {'sp': 1, 'd': 0}
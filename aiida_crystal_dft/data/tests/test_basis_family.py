@@ -59,3 +59,21 @@ def test_basis_family(aiida_profile, test_structure_data):
 1 1 3 0.0 0.0
 99 0
 """
+
+
+def test_element_index(aiida_profile):
+    from aiida.plugins import DataFactory
+    from aiida_crystal_dft.tests import TEST_DIR
+    from aiida_crystal_dft.data.basis import CrystalBasisData
+    root_dir = os.path.join(TEST_DIR, "input_files", "311g_ae")
+    basis_sets = CrystalBasisData.from_files([os.path.join(root_dir, f) for f in os.listdir(root_dir)])
+    DataFactory('crystal_dft.basis_family').get_or_create('311G_AE_INDEX', basis_sets=basis_sets)
+    # the index of the instance loaded from the db is built with a single query
+    bf, _ = DataFactory('crystal_dft.basis_family').get_or_create('311G_AE_INDEX')
+    assert bf.structure is None
+    assert {el: basis.uuid for el, basis in bf.element_index.items()} == \
+           {basis.element: basis.uuid for basis in basis_sets}
+    assert bf.get_basis("Mn").uuid == [basis for basis in basis_sets if basis.element == "Mn"][0].uuid
+    assert bf.group is bf.group
+    with pytest.raises(ValueError):
+        bf.get_basis("Xe")
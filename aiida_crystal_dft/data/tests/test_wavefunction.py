@@ -0,0 +1,90 @@
+#  Copyright (c)  Andrey Sobolev, 2020. Distributed under MIT license, see LICENSE file.
+
+"""
+A test suite for wave function references
+"""
+
+import os
+from hashlib import md5
+import numpy as np
+from aiida_crystal_dft.tests import TEST_DIR
+
+
+def test_remote_wavefunction(aiida_localhost):
+    from aiida.orm import load_node
+    from aiida_crystal_dft.io.f9 import Fort9
+    from aiida_crystal_dft.data.wavefunction import CrystalRemoteWavefunctionData
+    file_name = os.path.join(TEST_DIR, "output_files", "mgo_sto3g", "fort.9")
+    with open(file_name, 'rb') as f:
+        wf = CrystalRemoteWavefunctionData.from_file(f, '/scratch/calc', aiida_localhost)
+        expected = Fort9(f).get_metadata()
+    wf.store()
+    loaded = load_node(wf.pk)
+    assert isinstance(loaded, CrystalRemoteWavefunctionData)
+    assert loaded.path == '/scratch/calc/fort.9'
+    assert loaded.size == os.path.getsize(file_name)
+    with open(file_name, 'rb') as f:
+        assert loaded.checksum == md5(f.read()).hexdigest()
+    assert np.allclose(loaded.metadata["cell"], expected["cell"])
+    assert loaded.metadata["atomic_numbers"] == expected["atomic_numbers"]
+    # the consumers of wave function read the metadata without the file
+    parser = Fort9.from_node(loaded)
+    assert parser.get_ao_number() == expected["ao_number"]
+    assert parser.get_atomic_numbers().tolist() == expected["atomic_numbers"]
+
+
+def test_remote_wavefunction_no_metadata(aiida_localhost):
+    import pytest
+    from aiida_crystal_dft.io.f9 import Fort9
+    from aiida_crystal_dft.data.wavefunction import CrystalRemoteWavefunctionData
+    wf = CrystalRemoteWavefunctionData(remote_path='/scratch/calc', computer=aiida_localhost)
+    assert wf.size is None
+    with pytest.raises(ValueError):
+        Fort9.from_node(wf)
+
+
+def test_compressed_wavefunction(capsys):
+    import io
+    import time
+    from aiida.orm import load_node
+    from aiida_crystal_dft.io.f9 import Fort9
+    from aiida_crystal_dft.data.wavefunction import CrystalCompressedWavefunctionData, available_codecs
+    file_names = [os.path.join(TEST_DIR, "input_files", "issue_30", "fort.9"),
+                  os.path.join(TEST_DIR, "output_files", "mgo_sto3g", "fort.9"),
+                  os.path.join(TEST_DIR, "output_files", "optimise", "fort.9")]
+    assert 'gzip' in available_codecs()
+    for codec in available_codecs():
+        for file_name in file_names:
+            with open(file_name, 'rb') as f:
+                content = f.read()
+                f.seek(0)
+                start = time.perf_counter()
+                wf = CrystalCompressedWavefunctionData.from_file(f, codec=codec)
+                compress_time = time.perf_counter() - start
+            wf.store()
+            loaded = load_node(wf.pk)
+            assert isinstance(loaded, CrystalCompressedWavefunctionData)
+            assert loaded.codec == codec
+            assert loaded.size == len(content)
+            assert loaded.checksum == md5(content).hexdigest()
+            start = time.perf_counter()
+            uncompressed = io.BytesIO()
+            loaded.copy_uncompressed(uncompressed)
+            decompress_time = time.perf_counter() - start
+            assert uncompressed.getvalue() == content
+            with loaded.open_uncompressed() as stream:
+                assert stream.read(1024) == content[:1024]
+            # the metadata is read from the attributes
+            expected = Fort9(file_name).get_metadata()
+            assert Fort9.from_node(loaded).get_ao_number() == expected["ao_number"]
+            # and from the decompressed file when missing
+            wf_no_meta = CrystalCompressedWavefunctionData.from_file(io.BytesIO(content), codec=codec, metadata={})
+            assert wf_no_meta.metadata is None
+            assert Fort9.from_node(wf_no_meta).get_atomic_numbers().tolist() == expected["atomic_numbers"]
+            with loaded.open(mode='rb') as f:
+                compressed_size = len(f.read())
+            size_mb = len(content) / 1024 ** 2
+            with capsys.disabled():
+                print("\n{}, {}: ratio {:.2f}, compression {:.1f} MB/s, decompression {:.1f} MB/s".format(
+                    os.path.relpath(file_name, TEST_DIR), codec, len(content) / compressed_size,
+                    size_mb / compress_time, size_mb / decompress_time))
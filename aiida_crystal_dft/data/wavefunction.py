@@ -0,0 +1,216 @@
+#  Copyright (c)  Andrey Sobolev, 2020. Distributed under MIT license, see LICENSE file.
+
+"""
+The wave function (fort.9) data types: the reference to the file kept on the remote computer,
+and the compressed file kept in the repository
+"""
+import gzip
+import os
+import shutil
+import tempfile
+from hashlib import md5
+
+from aiida.orm import RemoteData, SinglefileData
+from aiida_crystal_dft.io.f9 import Fort9
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# the size of chunks files are read by
+CHUNK_SIZE = 1024 ** 2
+
+
+def _zstd_writer(f):
+    return zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False)
+
+
+def _zstd_reader(f):
+    return zstandard.ZstdDecompressor().stream_reader(f, closefd=False)
+
+
+def _lz4_writer(f):
+    return lz4.frame.LZ4FrameFile(f, mode='wb')
+
+
+def _lz4_reader(f):
+    return lz4.frame.LZ4FrameFile(f, mode='rb')
+
+
+def _gzip_writer(f):
+    return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6, mtime=0)
+
+
+def _gzip_reader(f):
+    return gzip.GzipFile(fileobj=f, mode='rb')
+
+
+# codec name: (file extension, streaming writer, streaming reader, availability)
+CODECS = {
+    'zstd': ('.zst', _zstd_writer, _zstd_reader, zstandard is not None),
+    'lz4': ('.lz4', _lz4_writer, _lz4_reader, lz4 is not None),
+    'gzip': ('.gz', _gzip_writer, _gzip_reader, True),
+}
+
+
+def available_codecs():
+    """Returns the names of codecs which can be used, in the order of preference"""
+    return [name for name, (_, _, _, available) in CODECS.items() if available]
+
+
+def compress(src, dst, codec):
+    """
+    Compresses binary file-like object src into dst by chunks
+    :return: the uncompressed size and MD5 hex digest of src
+    """
+    if codec not in available_codecs():
+        raise ValueError("Compression codec {} is not available (available are {})".format(
+            codec, ", ".join(available_codecs())))
+    digest = md5()
+    size = 0
+    writer = CODECS[codec][1](dst)
+    try:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+            writer.write(chunk)
+    finally:
+        writer.close()
+    return size, digest.hexdigest()
+
+
+def file_md5(f, chunk_size=CHUNK_SIZE):
+    """Returns MD5 hex digest of the binary file-like object, reading it by chunks"""
+    digest = md5()
+    f.seek(0)
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CrystalRemoteWavefunctionData(RemoteData):
+    """
+    A lightweight reference to fort.9 left in the remote working directory instead of the AiiDA repository.
+    Holds the size and the checksum of the file, as well as the geometry and the AO number (see Fort9.get_metadata)
+    """
+
+    def __init__(self, remote_path=None, filename='fort.9', size=None, checksum=None, metadata=None, **kwargs):
+        super(CrystalRemoteWavefunctionData, self).__init__(remote_path=remote_path, **kwargs)
+        self.set_attribute('filename', filename)
+        if size is not None:
+            self.set_attribute('size', size)
+        if checksum is not None:
+            self.set_attribute('checksum', checksum)
+        if metadata is not None:
+            self.set_attribute(Fort9.metadata_attribute, metadata)
+
+    @classmethod
+    def from_file(cls, f, remote_path, computer, filename='fort.9'):
+        """
+        Returns the reference to remote file with the local copy f (binary file-like object), which is read for
+        the size, checksum and metadata
+        """
+        metadata = Fort9(f).get_metadata()
+        f.seek(0, os.SEEK_END)
+        return cls(remote_path=remote_path, computer=computer, filename=filename,
+                   size=f.tell(), checksum=file_md5(f), metadata=metadata)
+
+    @property
+    def filename(self):
+        return self.get_attribute('filename')
+
+    @property
+    def path(self):
+        """The absolute path of the wave function on the remote computer"""
+        return os.path.join(self.get_remote_path(), self.filename)
+
+    @property
+    def size(self):
+        """The file size in bytes"""
+        return self.get_attribute('size', default=None)
+
+    @property
+    def checksum(self):
+        """MD5 hex digest of the file"""
+        return self.get_attribute('checksum', default=None)
+
+    @property
+    def metadata(self):
+        return self.get_attribute(Fort9.metadata_attribute, default=None)
+
+
+class CrystalCompressedWavefunctionData(SinglefileData):
+    """
+    fort.9 compressed with one of CODECS and stored in the repository. Holds the codec, the uncompressed size and
+    checksum, and the geometry and the AO number (see Fort9.get_metadata). The file is compressed and decompressed
+    by chunks, so it is never kept in memory as a whole
+    """
+
+    @classmethod
+    def from_file(cls, f, codec=None, metadata=None):
+        """
+        Returns the node with compressed binary file-like object f
+        :param f: fort.9 file-like object
+        :param codec: compression codec name (the first available of CODECS if None)
+        :param metadata: wave function metadata; read from f if None, not stored if empty
+        """
+        codec = codec or available_codecs()[0]
+        if metadata is None:
+            metadata = Fort9(f).get_metadata()
+        f.seek(0)
+        with tempfile.TemporaryFile() as tmp:
+            size, checksum = compress(f, tmp, codec)
+            tmp.seek(0)
+            node = cls(file=tmp, filename='fort.9' + CODECS[codec][0])
+        node.set_attribute('codec', codec)
+        node.set_attribute('size', size)
+        node.set_attribute('checksum', checksum)
+        if metadata:
+            node.set_attribute(Fort9.metadata_attribute, metadata)
+        return node
+
+    @property
+    def codec(self):
+        return self.get_attribute('codec')
+
+    @property
+    def size(self):
+        """The uncompressed file size in bytes"""
+        return self.get_attribute('size')
+
+    @property
+    def checksum(self):
+        """MD5 hex digest of the uncompressed file"""
+        return self.get_attribute('checksum')
+
+    @property
+    def metadata(self):
+        return self.get_attribute(Fort9.metadata_attribute, default=None)
+
+    def open_uncompressed(self):
+        """
+        Returns a context manager giving binary file-like object, which reads the uncompressed file sequentially.
+        Seeking backwards is not supported (use copy_uncompressed to get a seekable copy)
+        """
+        from contextlib import contextmanager
+
+        @contextmanager
+        def reader():
+            with self.open(mode='rb') as f:
+                stream = CODECS[self.codec][2](f)
+                try:
+                    yield stream
+                finally:
+                    stream.close()
+        return reader()
+
+    def copy_uncompressed(self, dst):
+        """Decompresses the file into binary file-like object dst by chunks"""
+        with self.open_uncompressed() as f:
+            shutil.copyfileobj(f, dst, CHUNK_SIZE)
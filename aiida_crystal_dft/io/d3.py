@@ -3,6 +3,7 @@
 An adapter for writing out .d3 file (for properties calculation)
 """
 from collections import defaultdict
+from functools import lru_cache
 
 import pyparsing as pp
 from aiida_crystal_dft.schemas import validate_with_json
@@ -12,6 +13,7 @@ from aiida_crystal_dft.utils.keywords import PROPERTIES_KEYWORDS
 pc = pp.pyparsing_common
 
 
+@lru_cache(maxsize=None)
 def _band_parser():
     kw = pp.Keyword("BAND")
     title = pp.Word(pp.alphas)('title')
@@ -21,6 +23,37 @@ def _band_parser():
     return kw + title + settings + pp.OneOrMore(segment)('path')
 
 
+# independent blocks of properties calculation, and the blocks they need to be preceded with
+D3_BLOCKS = (("band", ()),
+             ("dos", ("newk", )),
+             ("boltztra", ("newk", )))
+
+
+def split_parameters(parameters):
+    """
+    Splits the properties parameters into independent sets, which can be run with the same fort.9 concurrently.
+    Blocks needed by several sets (e.g. NEWK) are copied to each of them, and are not run on their own unless
+    there is nothing else to run
+    :param parameters: .d3 parameters dict
+    :return: a list of (block name, parameters dict) tuples in the order of .d3 file
+    """
+    result = []
+    used = set()
+    for name, needed in D3_BLOCKS:
+        if name not in parameters:
+            continue
+        block = {key: parameters[key] for key in needed if key in parameters}
+        block[name] = parameters[name]
+        used.update(block)
+        result.append((name, block))
+    # the blocks only preparing the others (e.g. NEWK) are not worth a calculation
+    preparing = {key for _, needed in D3_BLOCKS for key in needed}
+    result += [(key, {key: value}) for key, value in parameters.items() if key not in used and key not in preparing]
+    if not result and parameters:
+        return [(next(iter(parameters)), dict(parameters))]
+    return result
+
+
 class D3(object):
     """A writer for .d3 file (input for properties calculation)"""
 
@@ -2,6 +2,12 @@
 """
 A parser for fort.25 bands and DOS files
 """
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
 import numpy as np
 import pyparsing as pp
 
@@ -11,7 +17,13 @@ pc = pp.pyparsing_common
 
 __all__ = ["Fort25"]
 
+# fixed-width field sizes of fort.25 records: (A3,I1,A4,2I5,3E12.5), (2E12.5), (6I5), (6E12.5)
+_INT_WIDTH = 5
+_REAL_WIDTH = 12
+_REALS_PER_LINE = 6
+
 
+@lru_cache(maxsize=None)
 def band_parser():
     header = (pc.integer + pp.Word(pp.alphas) + 2 * pc.integer + 3 * pc.sci_real).setResultsName('header')
     e = (2 * pc.sci_real).setResultsName('energy')
@@ -20,6 +32,7 @@ def band_parser():
     return header + e + k_path + bands
 
 
+@lru_cache(maxsize=None)
 def dos_parser():
     header = (pc.integer + pp.Word(pp.alphas) + pp.Literal("1") + pc.integer + 3 * pc.sci_real).setResultsName('header')
     e = (2 * pc.sci_real).setResultsName('energy')
@@ -30,9 +43,18 @@ def dos_parser():
 
 class Fort25(object):
 
-    def __init__(self, file):
-        """A collection of parsers for various parts of fort.25 file."""
-        if isinstance(file, str):
+    def __init__(self, file, stream=False):
+        """
+        A collection of parsers for various parts of fort.25 file.
+        :param file: file name or file-like object
+        :param stream: if True, the file is memory-mapped (when possible) and read block by block into
+        preallocated arrays instead of being loaded into memory as a whole
+        """
+        self._file = None
+        self._data = None
+        if stream:
+            self._file = file
+        elif isinstance(file, str):
             with open(file, 'r') as f:
                 self._data = f.read().split('-%-')
         else:
@@ -42,22 +64,135 @@ class Fort25(object):
             "BAND": _parse_bands,
             "DOSS": _parse_dos,
         }
+        # pyparsing grammars used when the fixed-width fast path fails
+        self._grammar = {
+            "BAND": band_parser,
+            "DOSS": dos_parser,
+        }
 
     def parse(self):
         """The main parsing function. Returns a dictionary"""
+        if self._file is not None:
+            return self._parse_stream()
         result = {}
         # the resulting dictionary
         for part in self._parser.keys():
             data = [bloc for bloc in self._data if bloc[1:5] == part]
             if data:
-                result[part] = self._parser[part](data)
+                try:
+                    result[part] = self._parser[part](data, _read_block)
+                except (ValueError, IndexError):
+                    result[part] = self._parser[part](data, partial(_parse_block, self._grammar[part]))
+        return result
+
+    def _parse_stream(self):
+        """Parses memory-mapped file, converting the data block by block"""
+        result = {}
+        with _open_buffer(self._file) as buffer:
+            blocks = _find_blocks(buffer)
+            for part in self._parser.keys():
+                data = [offsets for kind, offsets in blocks if kind == part]
+                if data:
+                    try:
+                        result[part] = self._parser[part](data, partial(_map_block, buffer))
+                    except (ValueError, IndexError):
+                        data = [buffer[start:end].decode() for start, end in data]
+                        result[part] = self._parser[part](data, partial(_parse_block, self._grammar[part]))
         return result
 
 
-def _parse_bands(data):
-    """Band structure parser"""
-    bands_up = []
-    bands_down = []
+@contextmanager
+def _open_buffer(file):
+    """Yields a read-only memory map of the file, or its contents if the file can not be mapped"""
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            with _open_buffer(f) as buffer:
+                yield buffer
+        return
+    try:
+        fileno = file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+    if fileno is None or not os.fstat(fileno).st_size:
+        data = file.read()
+        yield data.encode() if isinstance(data, str) else data
+        return
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buffer:
+        yield buffer
+
+
+def _find_blocks(buffer):
+    """Returns a list of (kind, (start, end)) for every block, found in a single pass over the buffer"""
+    blocks = []
+    separator = b'-%-'
+    start = buffer.find(separator)
+    while start != -1:
+        end = buffer.find(separator, start + len(separator))
+        start += len(separator)
+        blocks.append((buffer[start + 1:start + 5].decode(), (start, end if end != -1 else len(buffer))))
+        start = end
+    return blocks
+
+
+def _read_block(datum):
+    """
+    Fast fixed-width block reader. Returns a tuple of (header, energy, integers, data), where data is a callable
+    returning the block values; the types are the same as for the pyparsing-based reader.
+    Raises ValueError if the block does not follow the fixed-width layout
+    """
+    head, energy, ints, data = datum.split('\n', 3)
+    return _read_header(head, energy, ints) + (partial(_read_reals, data), )
+
+
+def _map_block(buffer, offsets):
+    """The same as _read_block for a block of memory-mapped file given by its offsets; data are read on request"""
+    start, end = offsets
+    data_start = start
+    for _ in range(3):
+        data_start = buffer.find(b'\n', data_start, end) + 1
+        if not data_start:
+            raise ValueError("Block header is incomplete")
+    head, energy, ints = buffer[start:data_start].decode().splitlines()
+    return _read_header(head, energy, ints) + (lambda: _read_reals(buffer[data_start:end]), )
+
+
+def _read_header(head, energy, ints):
+    """Reads three header lines of the block by slicing the fixed-width fields"""
+    widths = (len(head.rstrip()), len(energy.rstrip()), len(ints.rstrip()))
+    if widths != (15 + 3 * _REAL_WIDTH, 2 * _REAL_WIDTH, 6 * _INT_WIDTH):
+        raise ValueError("Block header does not follow the fixed-width format")
+    header = [int(head[0]), head[1:5], int(head[5:10]), int(head[10:15])]
+    header += [float(head[i:i + _REAL_WIDTH]) for i in range(15, 15 + 3 * _REAL_WIDTH, _REAL_WIDTH)]
+    energy = [float(energy[i:i + _REAL_WIDTH]) for i in range(0, 2 * _REAL_WIDTH, _REAL_WIDTH)]
+    ints = [int(ints[i:i + _INT_WIDTH]) for i in range(0, 6 * _INT_WIDTH, _INT_WIDTH)]
+    return header, energy, ints
+
+
+def _read_reals(data):
+    """Converts a block of (6E12.5)-formatted lines (str or bytes) into a 1D float array at once"""
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    lines = [line.rstrip() for line in data.splitlines()]
+    lines = [line for line in lines if line]
+    line_width = _REALS_PER_LINE * _REAL_WIDTH
+    if not lines or any(len(line) != line_width for line in lines[:-1]) or len(lines[-1]) % _REAL_WIDTH:
+        raise ValueError("Data block does not follow the fixed-width format")
+    return np.frombuffer(b"".join(lines), dtype="S{}".format(_REAL_WIDTH)).astype(float)
+
+
+def _parse_block(parser, datum):
+    """Pyparsing-based block reader with the same output as _read_block"""
+    parsed_data = _parse_string(parser(), datum)
+    return (list(parsed_data[0:7]),
+            list(parsed_data[7:9]),
+            list(parsed_data[9:15]),
+            partial(np.array, parsed_data["data"].asList()))
+
+
+def _parse_bands(data, read_block=_read_block):
+    """Band structure parser. Headers are read first, so that band values go straight to preallocated arrays"""
+    blocks = [read_block(datum) for datum in data]
+    spins = []
     result = {
         "n_bands": 0,
         "e_fermi": 0,
@@ -66,34 +201,39 @@ def _parse_bands(data):
         "bands_up": None,
         "bands_down": None
     }
-    for datum in data:
-        parsed_data = _parse_string(band_parser(), datum)
+    for header, _, path, _ in blocks:
         if not result["n_bands"]:
-            result["n_bands"] = parsed_data["header"][2]
+            result["n_bands"] = header[2]
         else:
             # hope no bands just materialize out of thin air
-            assert result["n_bands"] == parsed_data["header"][2]
-        result["e_fermi"] = float(parsed_data["header"][-1])
+            assert result["n_bands"] == header[2]
+        result["e_fermi"] = float(header[-1])
         # gather k-point quantities for each segment
-        result["n_k"].append(parsed_data["header"][3])
-        path_segment = (tuple(parsed_data["path"][:3]), tuple(parsed_data["path"][3:]))
+        result["n_k"].append(header[3])
+        path_segment = (tuple(path[:3]), tuple(path[3:]))
         if path_segment not in result["path"]:
             result["path"].append(path_segment)
-            bands_up.append(np.array(parsed_data["data"].asList()).reshape(result["n_k"][-1], result["n_bands"]))
+            spins.append(0)
         else:
             # we have two band types
-            bands_down.append(np.array(parsed_data["data"].asList()).reshape(result["n_k"][-1], result["n_bands"]))
+            spins.append(1)
 
-    result["bands_up"] = np.vstack(bands_up)
-    result["bands_down"] = np.vstack(bands_down) if bands_down else None
+    n_k = [sum(k for k, spin in zip(result["n_k"], spins) if spin == i) for i in (0, 1)]
+    bands = [np.empty((n, result["n_bands"])) if n else None for n in n_k]
+    row = [0, 0]
+    for (_, _, _, values), k, spin in zip(blocks, result["n_k"], spins):
+        bands[spin][row[spin]:row[spin] + k] = values().reshape(k, result["n_bands"])
+        row[spin] += k
+    result["bands_up"], result["bands_down"] = bands
     return result
 
 
-def _parse_dos(data):
+def _parse_dos(data, read_block=_read_block):
     """Density of states parser. The parser used is the same as for bands"""
+    blocks = [read_block(datum) for datum in data]
     i_proj = 0
     spin = 0
-    dos = [[], []]
+    spins = []
     result = {
         "e_fermi": 0.,
         "e": None,
@@ -102,11 +242,10 @@ def _parse_dos(data):
         "dos_up": None,
         "dos_down": None
     }
-    for datum in data:
-        parsed_data = _parse_string(dos_parser(), datum)
-        _, _, _, n, _, de, e_fermi = parsed_data["header"]
-        _, e0 = parsed_data["energy"]
-        i, *_ = parsed_data["proj"]
+    for header, energy, proj, _ in blocks:
+        _, _, _, n, _, de, e_fermi = header
+        _, e0 = energy
+        i, *_ = proj
         if i <= i_proj:
             spin += 1
         i_proj = i
@@ -118,7 +257,12 @@ def _parse_dos(data):
         else:
             assert (e0, de, n) == (result["e0"], result["de"], len(result["e"]))
             assert result["e_fermi"] == e_fermi
-        dos[spin].append(np.array(parsed_data["data"].asList()))
-    dos = [np.vstack(dos_i) if dos_i else None for dos_i in dos]
+        spins.append(spin)
+    n_proj = [spins.count(i) for i in (0, 1)]
+    dos = [np.empty((n, len(result["e"]))) if n else None for n in n_proj]
+    row = [0, 0]
+    for (_, _, _, values), spin in zip(blocks, spins):
+        dos[spin][row[spin]] = values()
+        row[spin] += 1
     result["dos_up"], result["dos_down"] = dos
     return result
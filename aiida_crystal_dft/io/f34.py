@@ -1,5 +1,8 @@
 #  Copyright (c)  Andrey Sobolev, 2019. Distributed under MIT license, see LICENSE file.
 
+from functools import lru_cache
+from io import StringIO
+
 import numpy as np
 import spglib
 
@@ -7,6 +10,7 @@ from ase import Atoms
 from ase.data import chemical_symbols
 
 import pyparsing as pp
+from aiida_crystal_dft.utils import symmetry
 from aiida_crystal_dft.utils.geometry import get_crystal_system, get_centering_code
 from aiida_crystal_dft.io import _parse_string
 from aiida_crystal_dft.io.basis import BasisAdapter
@@ -14,6 +18,7 @@ from aiida_crystal_dft.io.basis import BasisAdapter
 PC = pp.pyparsing_common
 
 
+@lru_cache(maxsize=None)
 def f34_parser():
     """Fort.34 pyparsing parser"""
     header = (3 * PC.integer).setResultsName('header')
@@ -25,6 +30,53 @@ def f34_parser():
     return header + pp.Suppress(pp.restOfLine) + cell + nsymops + symops + nat + geom
 
 
+def _read_blocks(data):
+    """
+    Reads fort.34 contents: the header line first, then the cell, symmetry operators and atoms blocks, taking their
+    sizes from the counts preceding them; each block is converted to numpy array at once.
+    Raises ValueError or IndexError if the data does not follow the layout
+    """
+    header, data = data.split("\n", 1)
+    header = [int(x) for x in header.split()[:3]]
+    if len(header) != 3:
+        raise ValueError("fort.34 header is incomplete")
+    tokens = data.split()
+    n_symops = int(tokens[9])
+    symops_end = 10 + 12 * n_symops
+    nat = int(tokens[symops_end])
+    geometry = np.array(tokens[symops_end + 1:symops_end + 1 + 4 * nat], dtype=float).reshape((nat, 4))
+    atomic_numbers = geometry[:, 0].astype(int)
+    if not np.array_equal(atomic_numbers, geometry[:, 0]):
+        raise ValueError("Atomic numbers in fort.34 must be integer")
+    return {
+        'header': header,
+        'abc': np.array(tokens[:9], dtype=float).reshape((3, 3)),
+        'n_symops': n_symops,
+        'symops': np.array(tokens[10:symops_end], dtype=float).reshape((n_symops * 4, 3)),
+        'atomic_numbers': atomic_numbers.tolist(),
+        'positions': geometry[:, 1:]
+    }
+
+
+def _parse_grammar(data):
+    """Parses fort.34 contents with pyparsing grammar, returning the same as _read_blocks"""
+    parsed_data = _parse_string(f34_parser(), data)
+    n_symops = parsed_data['n_symops']
+    return {
+        'header': list(parsed_data['header']),
+        'abc': np.array(parsed_data['abc'].asList()).reshape((3, 3)),
+        'n_symops': n_symops,
+        'symops': np.array(parsed_data['symops'].asList()).reshape(n_symops * 4, 3),
+        'atomic_numbers': [d[0] for d in parsed_data['geometry']],
+        'positions': np.array([d[1:] for d in parsed_data['geometry']])
+    }
+
+
+def _format_rows(fmt, array):
+    """Formats all the rows of 2D array at once with the printf-style row format"""
+    return (fmt * len(array)) % tuple(array.ravel().tolist())
+
+
 class Fort34(object):
 
     def __init__(self, basis=None):
@@ -76,11 +128,11 @@ class Fort34(object):
         cell = (abc, positions, atomic_numbers)
 
         # get conventional cell
-        cell = spglib.standardize_cell(cell, to_primitive=False, no_idealize=False)
+        cell = symmetry.standardize_cell(cell, to_primitive=False)
         self.abc, self.positions, self.atomic_numbers = cell
 
         # symmetries related stuff
-        dataset = spglib.get_symmetry_dataset(spglib.find_primitive(cell))
+        dataset = symmetry.get_symmetry_dataset(symmetry.find_primitive(cell))
         self.space_group = dataset['number']
         self.crystal_type = get_crystal_system(self.space_group, as_number=True)
         self.centring = get_centering_code(self.space_group, dataset['international'])
@@ -117,22 +169,26 @@ class Fort34(object):
                 data = f.read()
         else:
             data = file.read()
-        parsed_data = _parse_string(f34_parser(), data)
+        try:
+            parsed_data = _read_blocks(data)
+        except (ValueError, IndexError):
+            # the grammar gives a meaningful error message
+            parsed_data = _parse_grammar(data)
         self.dimensionality, self.centring, self.crystal_type = parsed_data['header']
         if self.dimensionality != 3:
             raise NotImplementedError('Structure with dimensionality < 3 currently not supported')
 
         # primitive cell vectors and basis positions in cartesian coordinates
-        abc = np.array(parsed_data['abc'].asList()).reshape((3, 3))
-        positions = np.array([d[1:] for d in parsed_data['geometry']])
+        abc = parsed_data['abc']
+        positions = parsed_data['positions']
 
         # convert positions to fractional
         positions = np.dot(np.linalg.inv(abc).T, positions.T).T
-        atomic_numbers = [d[0] for d in parsed_data['geometry']]
+        atomic_numbers = parsed_data['atomic_numbers']
 
         # convert to conventional cell
         cell = (abc, positions, atomic_numbers)
-        cell = spglib.standardize_cell(cell, to_primitive=False, no_idealize=False)
+        cell = symmetry.standardize_cell(cell, to_primitive=False)
         self.abc, self.positions, atomic_numbers = cell
 
         # ECPs
@@ -140,7 +196,7 @@ class Fort34(object):
 
         # get symmetry operations
         self.n_symops = parsed_data['n_symops']
-        self.symops = np.array(parsed_data['symops'].asList()).reshape(self.n_symops * 4, 3)
+        self.symops = parsed_data['symops']
         rotations = np.zeros((self.n_symops, 3, 3))
         for i in range(3):
             rotations[:, i] = self.symops[i::4]
@@ -166,7 +222,9 @@ class Fort34(object):
             return self
         return NotImplementedError
 
-    def __str__(self):
+    def _primitive_geometry(self):
+        """Returns primitive cell vectors, symmetry operations, atomic numbers (taking ECPs into account)
+        and cartesian positions of symmetrically inequivalent atoms"""
         # check for ECPs in basis family
         has_ecp = []
         if self.basis and not self.basis.predefined:
@@ -175,16 +233,17 @@ class Fort34(object):
 
         # convert geometry to primitive and find inequivalent atoms
         cell = self.abc, self.positions, self.atomic_numbers
-        cell = spglib.standardize_cell(cell, to_primitive=True, no_idealize=False)
+        cell = symmetry.standardize_cell(cell, to_primitive=True)
         abc, positions, atomic_numbers = cell
 
         # symmetries related stuff
-        dataset = spglib.get_symmetry_dataset(cell)
+        dataset = symmetry.get_symmetry_dataset(cell)
 
         # leave only symmetrically inequivalent atoms
         inequiv_atoms = np.unique(dataset['equivalent_atoms'])
         positions = positions[inequiv_atoms]
         atomic_numbers = atomic_numbers[inequiv_atoms]
+        atomic_numbers = np.where(np.isin(atomic_numbers, has_ecp), atomic_numbers + 200, atomic_numbers)
 
         # convert positions from fractional to cartesian
         positions = np.dot(abc.T, positions.T).T
@@ -199,25 +258,25 @@ class Fort34(object):
         symops[1::4] = rotations[:, 1]
         symops[2::4] = rotations[:, 2]
         symops[3::4] = translations
+        return abc, symops, atomic_numbers, positions
 
-        # make a list of lines
-        f34_lines = ["{0} {1} {2}".format(self.dimensionality,
-                                          self.centring,
-                                          self.crystal_type)]
-        f34_lines += ["{0[0]:17.9E} {0[1]:17.9E} {0[2]:17.9E}".format(
-            np.round(vec, 9) + 0.) for vec in abc]
+    def write(self, f):
+        """Write geometry to file fort.34 (a file handle opened in text mode)"""
+        abc, symops, atomic_numbers, positions = self._primitive_geometry()
+        f.write("{0} {1} {2}\n".format(self.dimensionality, self.centring, self.crystal_type))
+        # + 0. gets rid of negative zeros
+        f.write(_format_rows("%17.9E %17.9E %17.9E\n", np.round(abc, 9) + 0.))
 
         # symmetry operation part
-        f34_lines.append(str(n_symops))
-        f34_lines += ["{0[0]:17.9E} {0[1]:17.9E} {0[2]:17.9E}".format(
-            np.round(line, 9) + 0.) for line in symops]
-        # atoms part
-        f34_lines.append(str(len(atomic_numbers)))
-        f34_lines += ["{0:3} {1[0]:17.9E} {1[1]:17.9E} {1[2]:17.9E}".format(
-            anum + 200 if anum in has_ecp else anum, pos) for anum, pos in zip(atomic_numbers, positions)]
+        f.write("{}\n".format(len(symops) // 4))
+        f.write(_format_rows("%17.9E %17.9E %17.9E\n", np.round(symops, 9) + 0.))
 
-        return "\n".join(f34_lines)
+        # atoms part
+        f.write("{}\n".format(len(atomic_numbers)))
+        f.write(_format_rows("%3d %17.9E %17.9E %17.9E\n", np.column_stack((atomic_numbers, positions))))
 
-    def write(self, f):
-        """Write geometry to file fort.34"""
-        print(self, file=f)
+    def __str__(self):
+        f = StringIO()
+        self.write(f)
+        # no trailing newline
+        return f.getvalue()[:-1]
@@ -2,7 +2,8 @@
 """A parser for fort.9, the binary file with wave functions
 """
 import os
-from scipy.io import FortranFile
+import tempfile
+import numpy as np
 from ase import Atoms
 from aiida_crystal_dft.utils.geometry import cart2frac
 
@@ -11,33 +12,116 @@ class Fort9(object):
 
     # limXXX, par, tol, inf, ?, xyvgve, ninv, basato(Z, crd), ...
     _record_types = ("int32", "float64", "int32", "int32", "float64", "float64", "int32", "float64", "float64")
+    # Fortran sequential record length marker
+    _marker_type = np.dtype("uint32")
+    # the name of the wave function node attribute holding the metadata
+    metadata_attribute = "fort9"
 
-    def __init__(self, file_name):
+    def __init__(self, file):
         """
         The parser for unformatted fort.9 file. For now just finds geometry.
+        Only the record length markers of the leading records are read on init; the records themselves are
+        memory-mapped and decoded on demand, so the wave function coefficients are never loaded.
 
-        :param file_name: fort.9 file name
+        :param file: fort.9 file name or a binary file-like object (should stay open while the records are read)
         """
         # do our best to check if the file is fort.9
-        if os.path.basename(file_name) != "fort.9":
-            raise ValueError("Expected fort.9 as the file name, got {} instead".format(os.path.basename(file_name)))
+        if isinstance(file, str) and os.path.basename(file) != "fort.9":
+            raise ValueError("Expected fort.9 as the file name, got {} instead".format(os.path.basename(file)))
+        self._file = file
         self._geometry = None
-        # read arrays from file
-        try:
-            with FortranFile(file_name) as f:
-                self._data = [f.read_record(rtype) for rtype in self._record_types]
-        except TypeError:
-            raise FileNotFoundError("Something is wrong with {} file, please check".format(file_name))
+        self._ao_number = None
+        self._records = {}
+        self._offsets = self._index_records()
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        """Returns the parser with the geometry and AO number taken from metadata dict (see get_metadata)"""
+        parser = cls.__new__(cls)
+        parser._file = None
+        parser._records = {}
+        parser._offsets = []
+        parser._geometry = (np.array(metadata["cell"]),
+                            np.array(metadata["positions"]),
+                            np.array(metadata["atomic_numbers"]))
+        parser._ao_number = metadata["ao_number"]
+        return parser
+
+    @classmethod
+    def from_node(cls, node):
+        """
+        Returns the parser for the wave function node. The metadata stored in the node attributes is used if present,
+        otherwise the geometry and AO number are read from the file at once. Compressed wave function is decompressed
+        into a temporary file by chunks
+        """
+        metadata = node.get_attribute(cls.metadata_attribute, default=None)
+        if metadata is not None:
+            return cls.from_metadata(metadata)
+        from aiida.orm import RemoteData
+        if isinstance(node, RemoteData):
+            raise ValueError("The wavefunction {} is not in the repository and has no metadata, "
+                             "so its geometry and AO number can not be read".format(node))
+        if hasattr(node, 'copy_uncompressed'):
+            with tempfile.TemporaryFile() as f:
+                node.copy_uncompressed(f)
+                return cls.from_metadata(cls(f).get_metadata())
+        with node.open(mode='rb') as f:
+            return cls.from_metadata(cls(f).get_metadata())
+
+    def _index_records(self):
+        """Returns (offset, length) in bytes for the leading records, reading only record markers"""
+        if isinstance(self._file, str):
+            with open(self._file, "rb") as f:
+                return self._read_markers(f)
+        self._file.seek(0)
+        return self._read_markers(self._file)
+
+    def _read_markers(self, f):
+        offsets = []
+        marker_size = self._marker_type.itemsize
+        for _ in self._record_types:
+            head = np.frombuffer(f.read(marker_size), dtype=self._marker_type)
+            if head.size != 1:
+                raise FileNotFoundError("Something is wrong with {} file, please check".format(self._file))
+            offsets.append((f.tell(), int(head[0])))
+            f.seek(int(head[0]), os.SEEK_CUR)
+            tail = np.frombuffer(f.read(marker_size), dtype=self._marker_type)
+            if tail.size != 1 or tail[0] != head[0]:
+                raise FileNotFoundError("Something is wrong with {} file, please check".format(self._file))
+        return offsets
+
+    def _read_record(self, i):
+        """Decodes i-th record through memory map (once)"""
+        if i not in self._records:
+            offset, length = self._offsets[i]
+            dtype = np.dtype(self._record_types[i])
+            if length % dtype.itemsize:
+                raise ValueError("Size of record {} is not a multiple of {} size".format(i, dtype))
+            if not length:
+                self._records[i] = np.empty(0, dtype=dtype)
+            elif isinstance(self._file, str):
+                # copy the record, so that the memory map is released right away
+                self._records[i] = np.array(np.memmap(self._file, dtype=dtype, mode="r", offset=offset,
+                                                      shape=(length // dtype.itemsize, )))
+            else:
+                self._file.seek(offset)
+                self._records[i] = np.frombuffer(self._file.read(length), dtype=dtype).copy()
+        return self._records[i]
+
+    @property
+    def _data(self):
+        """All the leading records"""
+        return [self._read_record(i) for i in range(len(self._record_types))]
 
     def _read_geometry(self):
         """Returns geometry from fort.9. All lengths are in Bohr. If scale=True, then convert positions to fractional.
         If ase=True, returns geometry as ase Atoms (independently of scale)"""
         # the first 9 entries of the 5th record (if counting from 0) contain cell (in Bohr; NB fort.34 has cell in Å)
-        cell = self._data[5][:9].reshape(3, 3).T
+        cell = self._read_record(5)[:9].reshape(3, 3).T
         # the 7th record contains atomic numbers
-        numbers = self._data[7].astype(int)
+        numbers = self._read_record(7).astype(int)
         # the 8th record contains cartesian atomic coordinates (also in Bohr; fort.34 has it in Å)
-        positions = self._data[8].reshape(len(numbers), 3)
+        positions = self._read_record(8).reshape(len(numbers), 3)
         # internally store positions in Cartesian coordinates
         self._geometry = (cell, positions, numbers)
 
@@ -69,5 +153,17 @@ class Fort9(object):
 
     def get_ao_number(self):
         """Get number of atomic orbitals (which is the number of bands)"""
-        # cast to python type for schemas purposes
-        return int(self._data[3][6])
+        if self._ao_number is None:
+            # cast to python type for schemas purposes
+            self._ao_number = int(self._read_record(3)[6])
+        return self._ao_number
+
+    def get_metadata(self):
+        """Returns the geometry (cartesian, in Bohr) and the number of AOs as a JSON-serializable dict"""
+        cell, positions, numbers = self.get_cell(scale=False)
+        return {
+            "cell": cell.tolist(),
+            "positions": positions.tolist(),
+            "atomic_numbers": numbers.tolist(),
+            "ao_number": self.get_ao_number()
+        }
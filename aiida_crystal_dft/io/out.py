@@ -3,6 +3,7 @@ Pycrystal-based CRYSTAL output parser
 """
 import io
 import pkg_resources
+from ase.units import Bohr
 from pycrystal import CRYSTOUT, CRYSTOUT_Error
 
 
@@ -11,18 +12,29 @@ class OutFileParser(object):
     parser_info = pkg_resources.require("pycrystal")[0].version
 
     def __init__(self, file):
-        if not isinstance(file, (str, io.StringIO)):
-            file_name = file.name
-            file.close()
-        else:
-            file_name = file
-
-        if not CRYSTOUT.acceptable(file_name):
-            raise FileNotFoundError("{} is not a valid CRYSTAL output file".format(file_name))
+        """
+        The parser of CRYSTAL output file
+        :param file: a file name or a file-like object (the latter is parsed in memory, so that the objects streamed
+        from AiiDA repository do not have to be copied to disk)
+        """
+        source = file if isinstance(file, str) else self._text_buffer(file)
+        if not CRYSTOUT.acceptable(source):
+            raise FileNotFoundError("{} is not a valid CRYSTAL output file".format(getattr(file, 'name', file)))
 
-        result = CRYSTOUT(file_name)
+        result = CRYSTOUT(source)
         self.info = result.info
 
+    @staticmethod
+    def _text_buffer(file):
+        """Returns seekable text file-like object for pycrystal (which reads the whole file in memory anyway)"""
+        if isinstance(file, io.TextIOBase) and file.seekable():
+            file.seek(0)
+            return file
+        data = file.read()
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='replace')
+        return io.StringIO(data)
+
     def get_parameters(self):
         """
          An adapter from pycrystal format to AiiDA output_parameters format, consistent with AiiDA-quantumespresso
@@ -31,7 +43,7 @@ class OutFileParser(object):
         """
         out_params = {
             'creator_name': "CRYSTAL",
-            'creator_version': self.info["program"]
+            'creator_version': self.info["program"],
             'exchange_correlation': self.info['H'],
             'energy': self.info['energy'],
             'energy_units': 'eV',
@@ -102,3 +114,18 @@ class OutFileParser(object):
 
     def get_trajectory(self):
         return self.info['structures']
+
+    def get_wavefunction_metadata(self):
+        """
+        Returns the geometry of the last structure and the number of AOs in fort.9 metadata format
+        (see Fort9.get_metadata), so that fort.9 itself is not needed, or None if they are not found
+        """
+        if not self.info['structures'] or self.info['n_ao'] is None:
+            return None
+        structure = self.info['structures'][-1]
+        return {
+            "cell": (structure.get_cell()[:] / Bohr).tolist(),
+            "positions": (structure.get_positions() / Bohr).tolist(),
+            "atomic_numbers": structure.get_atomic_numbers().tolist(),
+            "ao_number": int(self.info['n_ao'])
+        }
@@ -1,19 +1,24 @@
 #  Copyright (c)  Andrey Sobolev, 2019. Distributed under MIT license, see LICENSE file.
 """
-A collection of pyparsing-based block parsers
+A collection of pyparsing-based block parsers.
+Grammars are built once per process and reused, as they are never modified after construction.
 """
 
+from functools import lru_cache
+
 import pyparsing as pp
 
 pc = pp.pyparsing_common
 
 
+@lru_cache(maxsize=None)
 def d12_geometry_parser():
     """Geometry block parser"""
     title = pp.restOfLine()('title')
     return title
 
 
+@lru_cache(maxsize=None)
 def gto_basis_parser():
     """
     Gaussian-type orbital basis parser with pyparsing
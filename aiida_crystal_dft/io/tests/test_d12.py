@@ -13,3 +13,58 @@ def test_input_full(test_basis_family_predefined):
     d12_file = D12(parameters=d12_input, basis=test_basis_family_predefined)
     outstr = str(d12_file)
     assert outstr == d12_expected
+
+
+def test_input_guessp(test_basis_family_predefined):
+    from copy import deepcopy
+    from aiida_crystal_dft.tests import d12_input
+    from aiida_crystal_dft.io.d12 import D12
+    restart_input = deepcopy(d12_input)
+    restart_input["scf"]["guessp"] = True
+    lines = str(D12(parameters=restart_input, basis=test_basis_family_predefined)).split('\n')
+    assert lines.index('GUESSP') == lines.index('SPINLOCK') + 2
+    assert 'GUESSP' not in str(D12(parameters=d12_input, basis=test_basis_family_predefined))
+
+
+def test_input_optimise_defaults(test_basis_family_predefined):
+    from aiida_crystal_dft.io.d12 import D12
+    parameters = {"scf": {"k_points": (8, 8)}, "geometry": {"optimise": True}}
+    lines = str(D12(parameters=parameters, basis=test_basis_family_predefined)).split('\n')
+    # optimisation with CRYSTAL defaults
+    assert lines[lines.index('OPTGEOM') + 1] == 'ENDOPT'
+
+
+def test_input_benchmark(test_basis_family_predefined, monkeypatch):
+    import time
+    from copy import deepcopy
+    from jinja2 import Environment, FileSystemLoader
+    from aiida_crystal_dft.tests import d12_input
+    from aiida_crystal_dft.io import d12
+    from aiida_crystal_dft.io.d12 import D12
+    from aiida_crystal_dft.schemas import jinja
+    scf_input = deepcopy(d12_input)
+    del scf_input["geometry"]
+    phonons_input = deepcopy(scf_input)
+    phonons_input["geometry"] = {"phonons": {"TEMPERAT": [273, 1073, 100], "info_print": ["ALL", "FREQ"]}}
+    elastic_input = deepcopy(scf_input)
+    elastic_input["geometry"] = {"elastic_constants": {"type": "ELASTCON", "convergence": {"TOLDEG": 0.0003}}}
+    inputs = [d12_input, scf_input, phonons_input, elastic_input] * 25
+
+    def uncached_template(schema='d12.j2'):
+        env = Environment(loader=FileSystemLoader(jinja.TEMPLATE_DIR),
+                          lstrip_blocks=True,
+                          trim_blocks=True,
+                          keep_trailing_newline=True)
+        return env.get_template(schema)
+
+    def render():
+        start = time.perf_counter()
+        result = [str(D12(parameters=params, basis=test_basis_family_predefined)) for params in inputs]
+        return result, time.perf_counter() - start
+
+    cached, cached_time = render()
+    monkeypatch.setattr(d12, "get_template", uncached_template)
+    uncached, uncached_time = render()
+    assert cached == uncached
+    print("\nD12 rendering of {} inputs: cached environment {:.1f} ms, new environment {:.1f} ms".format(
+        len(inputs), cached_time * 1e3, uncached_time * 1e3))
@@ -54,3 +54,20 @@ def test_d3_reader(aiida_profile):
                            "mgo_sto3g.d3")
     parameters = D3().read(d3_file)
     assert parameters
+
+
+def test_split_parameters():
+    from aiida_crystal_dft.io.d3 import split_parameters
+    newk = {"k_points": [6, 6]}
+    band = {"shrink": 12, "k_points": 30, "first": 7, "last": 14, "bands": [["G", "Y"]]}
+    dos = {"n_e": 120, "first": 7, "last": 14}
+    boltztra = {"trange": [300, 600, 100], "murange": [-0.1, 0.1, 0.01], "tdfrange": [-0.2, 0.2, 0.01]}
+    blocks = split_parameters({"band": band, "newk": newk, "dos": dos, "boltztra": boltztra})
+    assert blocks == [("band", {"band": band}),
+                      ("dos", {"newk": newk, "dos": dos}),
+                      ("boltztra", {"newk": newk, "boltztra": boltztra})]
+    for _, parameters in blocks:
+        assert str(D3(parameters))
+    # NEWK is not run on its own if there is something else to run
+    assert split_parameters({"newk": newk, "band": band}) == [("band", {"band": band})]
+    assert split_parameters({"newk": newk}) == [("newk", {"newk": newk})]
@@ -75,3 +75,62 @@ def test_read_spinpolarized_dos():
     assert len(dos["e"]) == 25002
     assert dos["dos_up"].shape == (1, 25002)
     assert dos["dos_down"].shape == (1, 25002)
+
+
+def test_fast_reader_matches_grammar():
+    from functools import partial
+    import numpy as np
+    from aiida_crystal_dft.io.f25 import _read_block, _parse_block
+    for file_name in (os.path.join(TEST_DIR, "output_files", "mgo_sto3g", "fort.25"),
+                      os.path.join(TEST_DIR, "output_files", "negative_band_path.fort.25"),
+                      os.path.join(TEST_DIR, "output_files", "spinpolarized.fort.25")):
+        parser = Fort25(file_name)
+        for part, parse in parser._parser.items():
+            data = [bloc for bloc in parser._data if bloc[1:5] == part]
+            if not data:
+                continue
+            fast = parse(data, _read_block)
+            slow = parse(data, partial(_parse_block, parser._grammar[part]))
+            assert fast.keys() == slow.keys()
+            for key, value in fast.items():
+                if isinstance(value, np.ndarray):
+                    assert np.array_equal(value, slow[key])
+                else:
+                    assert value == slow[key]
+
+
+def test_grammar_fallback():
+    from io import StringIO
+    file_name = os.path.join(TEST_DIR,
+                             "output_files",
+                             "mgo_sto3g",
+                             "fort.25")
+    with open(file_name) as f:
+        # shifted lines break the fixed-width layout but not the grammar
+        lines = [line if line.startswith("-%-") else " " + line for line in f]
+    reference = Fort25(file_name).parse()
+    result = Fort25(StringIO("".join(lines))).parse()
+    assert result["BAND"]["n_k"] == reference["BAND"]["n_k"]
+    assert result["BAND"]["bands_up"].shape == reference["BAND"]["bands_up"].shape
+    assert result["DOSS"]["dos_up"].shape == reference["DOSS"]["dos_up"].shape
+
+
+def test_stream():
+    from io import BytesIO
+    import numpy as np
+    for file_name in (os.path.join(TEST_DIR, "output_files", "mgo_sto3g", "fort.25"),
+                      os.path.join(TEST_DIR, "output_files", "lif_broken_band_path.fort.25"),
+                      os.path.join(TEST_DIR, "output_files", "spinpolarized.fort.25")):
+        reference = Fort25(file_name).parse()
+        with open(file_name, 'rb') as f:
+            results = [Fort25(file_name, stream=True).parse(),
+                       Fort25(f, stream=True).parse(),
+                       Fort25(BytesIO(f.read()), stream=True).parse()]
+        for result in results:
+            assert result.keys() == reference.keys()
+            for part in result:
+                for key, value in result[part].items():
+                    if isinstance(value, np.ndarray):
+                        assert np.array_equal(value, reference[part][key])
+                    else:
+                        assert value == reference[part][key]
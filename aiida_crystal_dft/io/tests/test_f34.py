@@ -60,3 +60,67 @@ def test_read():
     assert reader.centring == 5
     assert reader.n_symops == 48
     assert reader.space_group == 225
+
+
+def test_write(aiida_profile, test_ase_structure):
+    import io
+    import time
+    import numpy as np
+    from aiida_crystal_dft.io.f34 import Fort34, _format_rows
+    structure = test_ase_structure.repeat((4, 4, 4))
+    structure.rattle(1e-3, seed=1)
+    writer = Fort34().from_ase(structure)
+    abc, symops, atomic_numbers, positions = writer._primitive_geometry()
+    # line by line formatting
+    f34_lines = ["{0} {1} {2}".format(writer.dimensionality, writer.centring, writer.crystal_type)]
+    f34_lines += ["{0[0]:17.9E} {0[1]:17.9E} {0[2]:17.9E}".format(np.round(vec, 9) + 0.) for vec in abc]
+    f34_lines.append(str(len(symops) // 4))
+    f34_lines += ["{0[0]:17.9E} {0[1]:17.9E} {0[2]:17.9E}".format(np.round(line, 9) + 0.) for line in symops]
+    f34_lines.append(str(len(atomic_numbers)))
+    start = time.perf_counter()
+    f34_lines += ["{0:3} {1[0]:17.9E} {1[1]:17.9E} {1[2]:17.9E}".format(anum, pos)
+                  for anum, pos in zip(atomic_numbers, positions)]
+    lines_time = time.perf_counter() - start
+    expected = "\n".join(f34_lines)
+    f = io.StringIO()
+    writer.write(f)
+    assert f.getvalue() == expected + "\n"
+    assert str(writer) == expected
+    start = time.perf_counter()
+    _format_rows("%3d %17.9E %17.9E %17.9E\n", np.column_stack((atomic_numbers, positions)))
+    rows_time = time.perf_counter() - start
+    print("\nFormatting {} atoms of fort.34: line by line {:.2f} ms, at once {:.2f} ms".format(
+        len(atomic_numbers), lines_time * 1e3, rows_time * 1e3))
+
+
+def test_read_blocks():
+    import time
+    import numpy as np
+    from aiida_crystal_dft.io.f34 import _read_blocks, _parse_grammar, _format_rows
+    from aiida_crystal_dft.tests import TEST_DIR
+    file_names = [os.path.join(TEST_DIR, 'input_files', 'mgo_sto3g_external.crystal.gui'),
+                  os.path.join(TEST_DIR, 'output_files', 'mgo_sto3g', 'fort.34'),
+                  os.path.join(TEST_DIR, 'input_files', 'issue_30', 'fort.34')]
+    contents = []
+    for file_name in file_names:
+        with open(file_name) as f:
+            contents.append(f.read())
+    # synthetic 10k atoms fort.34
+    rng = np.random.default_rng(1)
+    nat = 10000
+    geometry = np.column_stack((rng.integers(1, 90, nat), rng.random((nat, 3)) * 50.))
+    contents.append("3 1 1 E -1.0E+05\n" + _format_rows("%17.9E %17.9E %17.9E\n", np.eye(3) * 50.) +
+                    "1\n" + _format_rows("%17.9E %17.9E %17.9E\n", np.vstack((np.eye(3), np.zeros(3)))) +
+                    "{}\n".format(nat) + _format_rows("%3d %17.9E %17.9E %17.9E\n", geometry))
+    for data in contents:
+        start = time.perf_counter()
+        expected = _parse_grammar(data)
+        grammar_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = _read_blocks(data)
+        blocks_time = time.perf_counter() - start
+        assert result.keys() == expected.keys()
+        for key in result:
+            assert np.array_equal(result[key], expected[key])
+    print("\nfort.34 with {} atoms: grammar {:.1f} ms, blocks {:.1f} ms".format(
+        nat, grammar_time * 1e3, blocks_time * 1e3))
@@ -43,3 +43,32 @@ def test_tof98():
                         "fort.9")
     parser = Fort9(name)
     print(parser._data)
+
+
+def test_lazy_records():
+    import numpy as np
+    from scipy.io import FortranFile
+    parser = Fort9(file_name)
+    assert not parser._records
+    assert parser.get_ao_number() == 18
+    assert sorted(parser._records) == [3]
+    with FortranFile(file_name) as f:
+        expected = [f.read_record(rtype) for rtype in Fort9._record_types]
+    for record, expected_record in zip(parser._data, expected):
+        assert np.array_equal(record, expected_record)
+
+
+def test_from_node(test_wavefunction):
+    import numpy as np
+    parser = Fort9(file_name)
+    # no metadata: the file is read from the repository
+    from_file = Fort9.from_node(test_wavefunction)
+    assert from_file.get_metadata() == parser.get_metadata()
+    # metadata given: the file is not touched
+    metadata = parser.get_metadata()
+    metadata["ao_number"] = 36
+    test_wavefunction.set_attribute(Fort9.metadata_attribute, metadata)
+    from_metadata = Fort9.from_node(test_wavefunction)
+    assert from_metadata.get_ao_number() == 36
+    for value, expected in zip(from_metadata.get_cell(), parser.get_cell()):
+        assert np.allclose(value, expected)
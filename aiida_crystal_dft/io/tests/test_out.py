@@ -17,3 +17,17 @@ def test_out():
     # pprint(res)
     assert res['creator_name'] == 'CRYSTAL'
     assert res['creator_version'] == '17 1.0.1'
+
+
+def test_out_file_like():
+    """A test of parsing out file from text and binary file-like objects"""
+    import io
+    out_file = os.path.join(TEST_DIR, 'output_files', 'mgo_sto3g', 'opt', 'crystal.out')
+    expected = OutFileParser(out_file).get_parameters()
+    with open(out_file) as f:
+        assert OutFileParser(f).get_parameters() == expected
+        # the handle is not closed
+        assert not f.closed
+    with open(out_file, 'rb') as f:
+        # a binary stream without a file name
+        assert OutFileParser(io.BytesIO(f.read())).get_parameters() == expected
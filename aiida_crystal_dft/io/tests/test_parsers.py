@@ -202,3 +202,25 @@ def test_basis_parser_issue_39():
     parser = gto_basis_parser()
     res = parser.parseString(basis)
     assert res['bs'][0][1][0] == 225338
+
+
+def test_grammar_cache():
+    """Grammars are built once per process; prints per-call parse latency for realistic inputs"""
+    import os
+    import timeit
+    from aiida_crystal_dft.tests import TEST_DIR
+    from aiida_crystal_dft.io.f34 import f34_parser
+    from aiida_crystal_dft.io.f25 import band_parser
+    inputs = (
+        ("basis", gto_basis_parser, os.path.join(TEST_DIR, "input_files", "tzvp", "Cd.basis")),
+        ("fort.34", f34_parser, os.path.join(TEST_DIR, "output_files", "optimise", "fort.34")),
+        ("fort.25", band_parser, os.path.join(TEST_DIR, "output_files", "mgo_sto3g", "fort.25")),
+    )
+    for name, factory, file_name in inputs:
+        assert factory() is factory()
+        with open(file_name) as f:
+            # fort.25 grammar parses a single block
+            text = f.read().split('-%-')[1] if name == "fort.25" else f.read()
+        n_calls = 20
+        latency = timeit.timeit(lambda: factory().parseString(text), number=n_calls) / n_calls
+        print("{}: {:.2f} ms per call".format(name, latency * 1e3))
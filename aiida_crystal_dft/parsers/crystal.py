@@ -2,12 +2,17 @@
 """
 Pycrystal-based parser for CRYSTAL AiiDA plugin
 """
+import os
+import time
+import numpy as np
 from aiida.parsers.parser import Parser
 from aiida.common import OutputParsingError, NotExistent
 from aiida.plugins import CalculationFactory, DataFactory
 
 from aiida_crystal_dft.io.out import OutFileParser, CRYSTOUT_Error
 from aiida_crystal_dft.io.f34 import Fort34
+from aiida_crystal_dft.io.f9 import Fort9
+from aiida_crystal_dft.data.wavefunction import CrystalRemoteWavefunctionData, CrystalCompressedWavefunctionData
 
 
 class CrystalParser(Parser):
@@ -38,6 +43,7 @@ class CrystalParser(Parser):
 
         self.is_parallel = "parallel" in calc_cls[calc_node.process_label]
         self.stdout_parser = None
+        self.parse_time = None
         self.converged_ionic = None
         self.converged_electronic = None
 
@@ -61,16 +67,22 @@ class CrystalParser(Parser):
         else:
             results_file = self._node.get_option('output_filename')
 
-        # Check if we can parse results file, the error message if not
+        # Parse results file once, its info is shared by all the output nodes
+        parse_error = None
+        start = time.perf_counter()
         try:
             with folder.open(results_file) as f:
-                print(OutFileParser(f).get_parameters())
+                self.stdout_parser = OutFileParser(f)
         except CRYSTOUT_Error as ex:
             if 'Inadequate elastic calculation' in ex.msg:
                 return self.exit_codes.ERROR_REOPTIMIZATION_NEEDED
+            # fort.87 might contain a more specific error
+            parse_error = ex
+        self.parse_time = time.perf_counter() - start
 
         # Check for error file contents
         scf_failed = False
+        optimisation_failed = False
         if 'fort.87' in folder.list_object_names():
             with folder.open('fort.87') as f:
                 error = f.readline()
@@ -88,8 +100,9 @@ class CrystalParser(Parser):
                 elif 'NEIGHBOR LIST TOO BIG' in error:
                     return self.exit_codes.ERROR_NEIGHBOR_LIST_TOO_BIG
 
+                # the last geometry and wave function are needed for restart, so parse them as well
                 elif 'GEOMETRY OPTIMIZATION FAILED' in error:
-                    return self.exit_codes.ERROR_GEOMETRY_OPTIMIZATION_FAILED
+                    optimisation_failed = True
 
                 elif 'ALL G-VECTORS USED' in error:
                     return self.exit_codes.ERROR_NO_G_VECTORS
@@ -115,35 +128,59 @@ class CrystalParser(Parser):
                 elif error:
                     return self.exit_codes.ERROR_UNKNOWN
 
-        with folder.open(results_file) as f:
-            self.add_node(self._linkname_parameters, f, self.parse_stdout)
-        with folder.open('fort.9', 'rb') as f:
-            self.add_node(self._linkname_wavefunction, f, self.parse_out_wavefunction)
-        with folder.open('fort.34') as f:
-            self.add_node(self._linkname_structure, f, self.parse_out_structure)
-        with folder.open(results_file) as f:
-            self.add_node(self._linkname_trajectory, f, self.parse_out_trajectory)
+        if parse_error is not None:
+            if optimisation_failed:
+                return self.exit_codes.ERROR_GEOMETRY_OPTIMIZATION_FAILED
+            raise parse_error
+        self.add_node(self._linkname_parameters, self.stdout_parser, self.parse_stdout)
+        # fort.9 left on the remote is not retrieved, its metadata are taken from the output
+        temporary_folder = kwargs.get('retrieved_temporary_folder')
+        if not isinstance(temporary_folder, str):
+            temporary_folder = None
+        wavefunction = os.path.join(temporary_folder, 'fort.9') if temporary_folder else None
+        wavefunction_error = None
+        if self.node.get_option('remote_wavefunction'):
+            if self.converged_electronic and self.stdout_parser.get_wavefunction_metadata() is None:
+                # the reference would be useless for the wavefunction consumers
+                wavefunction_error = self.exit_codes.ERROR_NO_WAVEFUNCTION_METADATA
+            else:
+                self.add_node(self._linkname_wavefunction, temporary_folder, self.parse_out_remote_wavefunction)
+        # fort.9 is retrieved to the temporary folder (or to the retrieved folder by older versions)
+        elif wavefunction is not None and os.path.isfile(wavefunction):
+            with open(wavefunction, 'rb') as f:
+                self.add_node(self._linkname_wavefunction, f, self.parse_out_wavefunction)
+        elif 'fort.9' in folder.list_object_names():
+            with folder.open('fort.9', 'rb') as f:
+                self.add_node(self._linkname_wavefunction, f, self.parse_out_wavefunction)
+        # fort.34 is retrieved only for geometry optimisation
+        if 'fort.34' in folder.list_object_names():
+            with folder.open('fort.34') as f:
+                self.add_node(self._linkname_structure, f, self.parse_out_structure)
+        self.add_node(self._linkname_trajectory, self.stdout_parser, self.parse_out_trajectory)
         if scf_failed:
             return self.exit_codes.ERROR_SCF_FAILED
-        return None
+        if optimisation_failed:
+            return self.exit_codes.ERROR_GEOMETRY_OPTIMIZATION_FAILED
+        return wavefunction_error
 
     def add_node(self, link_name, f, callback):
         """
         Add output nodes from parse functions
         :param link_name: output node link
-        :param f: output file handle
+        :param f: output file handle (or the results file parser)
         :param callback: callback function
         """
         parse_result = callback(f)
         if parse_result is not None:
             self.out(link_name, parse_result)
 
-    def parse_stdout(self, f):
-        self.stdout_parser = OutFileParser(f)
-        params = self.stdout_parser.get_parameters()
+    def parse_stdout(self, stdout_parser):
+        params = stdout_parser.get_parameters()
         # raise flag if structure (atomic and electronic) is good
         self.converged_electronic = params['converged_electronic']
         self.converged_ionic = params['converged_ionic']
+        params['parse_time'] = self.parse_time
+        params['parse_time_units'] = 's'
         return DataFactory('dict')(dict=params)
 
     def parse_out_structure(self, f):
@@ -155,21 +192,64 @@ class CrystalParser(Parser):
     def parse_out_wavefunction(self, f):
         if not self.converged_electronic:
             return None
-        return DataFactory('singlefile')(file=f)
+        # store geometry and AO number with the node, so that its consumers do not need to read the file
+        try:
+            metadata = Fort9(f).get_metadata()
+        except (FileNotFoundError, ValueError) as err:
+            self.logger.warning("Could not read metadata from fort.9: {}".format(err))
+            metadata = None
+        f.seek(0)
+        codec = self.node.get_option('wavefunction_compression')
+        if codec:
+            return CrystalCompressedWavefunctionData.from_file(f, codec=codec, metadata=metadata or {})
+        wavefunction = DataFactory('singlefile')(file=f)
+        if metadata is not None:
+            wavefunction.set_attribute(Fort9.metadata_attribute, metadata)
+        return wavefunction
+
+    def parse_out_remote_wavefunction(self, temporary_folder):
+        if not self.converged_electronic:
+            return None
+        # the size and the checksum are written on the remote by the job script
+        size, checksum = None, None
+        info_file = os.path.join(temporary_folder, 'fort.9.info') if temporary_folder else None
+        if info_file is not None and os.path.isfile(info_file):
+            with open(info_file) as f:
+                size, checksum = [line.strip() for line in f][:2]
+            size = int(size)
+        else:
+            self.logger.warning("Could not find the size and the checksum of the remote fort.9")
+        return CrystalRemoteWavefunctionData(remote_path=self.node.get_remote_workdir(), computer=self.node.computer,
+                                             size=size, checksum=checksum,
+                                             metadata=self.stdout_parser.get_wavefunction_metadata())
 
     def parse_out_trajectory(self, _):
         try:
             ase_structs = self.stdout_parser.get_trajectory()
             if not ase_structs:
                 return None
-            structs = [DataFactory('structure')(ase=struct) for struct in ase_structs]
-            traj = DataFactory('array.trajectory')()
-            traj.set_structurelist(structs)
-            return traj
+            return self.get_trajectory(ase_structs)
         except ValueError as exc:
             # fix for SCELPHONO keyword, since a supercell has more atoms than a regular cell
-            bz_points = self.stdout_parser.info['phonons'].get(['modes'], {})
+            bz_points = self.stdout_parser.info['phonons'].get('modes', {})
             if bz_points and len(bz_points) > 1:
                 return None
             else:
                 raise exc
+
+    @staticmethod
+    def get_trajectory(ase_structs):
+        """
+        Returns TrajectoryData with cells and positions of ase structures stacked into (N, 3, 3)
+        and (N, natoms, 3) arrays, without making intermediate StructureData nodes
+        :param ase_structs: a list of ase Atoms with the same atoms
+        """
+        symbols = ase_structs[0].get_chemical_symbols()
+        if any(struct.get_chemical_symbols() != symbols for struct in ase_structs[1:]):
+            raise ValueError("All the structures in trajectory must have the same atoms")
+        traj = DataFactory('array.trajectory')()
+        traj.set_trajectory(symbols=symbols,
+                            positions=np.array([struct.get_positions() for struct in ase_structs], dtype=float),
+                            cells=np.array([struct.get_cell()[:] for struct in ase_structs], dtype=float),
+                            pbc=ase_structs[0].get_pbc().tolist())
+        return traj
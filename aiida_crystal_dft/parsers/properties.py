@@ -51,9 +51,14 @@ class PropertiesParser(Parser):
         except NotExistent:
             return self.exit_codes.ERROR_NO_RETRIEVED_FOLDER
 
+        # some blocks (e.g. BOLTZTRA) do not write fort.25
+        if "fort.25" not in folder.list_object_names():
+            self.logger.info("No fort.25 found, nothing to parse")
+            return None
+
         # parse file here
-        with folder.open("fort.25") as f:
-            parser = Fort25(f)
+        with folder.open("fort.25", "rb") as f:
+            parser = Fort25(f, stream=True)
             result = parser.parse()
             self.add_node(self._linkname_bands,
                           result.get("BAND", None),
@@ -82,10 +87,8 @@ class PropertiesParser(Parser):
         shrink = self.node.inputs.parameters.dict.band['shrink']
         path = bands["path"]
         k_number = bands["n_k"]
-        # for path construction we're getting geometry from fort.9
-        with self.node.inputs.wavefunction.open() as f:
-            fort9_name = f.name
-        geometry_parser = Fort9(fort9_name)
+        # for path construction we're getting geometry from fort.9 (or from its metadata, if present)
+        geometry_parser = Fort9.from_node(self.node.inputs.wavefunction)
         cell = geometry_parser.get_cell(scale=True)
         path_description = construct_kpoints_path(cell, path, shrink, k_number)
         structure = DataFactory('structure')(ase=geometry_parser.get_ase())
@@ -1,4 +1,5 @@
 #   Copyright (c)  Andrey Sobolev, 2019. Distributed under MIT license, see LICENSE file.
+import pytest
 
 
 def test_crystal_parser(crystal_calc_inputs):
@@ -65,3 +66,96 @@ def test_crystal_elastic_parser(crystal_calc_node):
     assert parser._linkname_parameters in nodes
     assert isinstance(nodes[parser._linkname_parameters], DataFactory("dict"))
     assert nodes[parser._linkname_parameters].dict.elastic['bulk_modulus'] == 470.57
+
+
+def test_crystal_parser_wavefunction_metadata(crystal_calc_node):
+    from aiida_crystal_dft.parsers.crystal import CrystalParser
+    from aiida_crystal_dft.io.f9 import Fort9
+    calcnode = crystal_calc_node()
+    parser = CrystalParser(calcnode)
+    parser.parse()
+    nodes = parser.outputs
+    assert parser._linkname_wavefunction in nodes
+    metadata = nodes[parser._linkname_wavefunction].get_attribute(Fort9.metadata_attribute)
+    assert metadata["ao_number"] == 18
+    assert sorted(metadata["atomic_numbers"]) == [8, 12]
+
+
+def test_crystal_parser_single_pass(crystal_calc_node, monkeypatch):
+    from aiida_crystal_dft.io import out
+    from aiida_crystal_dft.parsers.crystal import CrystalParser
+    calls = []
+
+    class CountingCRYSTOUT(out.CRYSTOUT):
+        def __init__(self, *args, **kwargs):
+            calls.append(args)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(out, "CRYSTOUT", CountingCRYSTOUT)
+    calcnode = crystal_calc_node()
+    parser = CrystalParser(calcnode)
+    parser.parse()
+    assert len(calls) == 1
+    parameters = parser.outputs[parser._linkname_parameters]
+    assert parameters['parse_time'] > 0
+    assert parameters['parse_time_units'] == 's'
+
+
+def test_crystal_parser_trajectory(crystal_calc_node):
+    import numpy as np
+    from aiida_crystal_dft.parsers.crystal import CrystalParser
+    calcnode = crystal_calc_node(files={'crystal.out': 'mgo_sto3g/opt'})
+    parser = CrystalParser(calcnode)
+    parser.parse()
+    trajectory = parser.outputs[parser._linkname_trajectory]
+    ase_structs = parser.stdout_parser.get_trajectory()
+    assert trajectory.numsteps == len(ase_structs) > 1
+    assert trajectory.get_positions().shape == (len(ase_structs), len(ase_structs[0]), 3)
+    assert trajectory.symbols == ase_structs[0].get_chemical_symbols()
+    for i, struct in enumerate(ase_structs):
+        assert np.array_equal(trajectory.get_positions()[i], struct.get_positions())
+        assert np.array_equal(trajectory.get_cells()[i], struct.get_cell())
+    assert trajectory.get_step_structure(1).get_ase().get_chemical_symbols() == ase_structs[1].get_chemical_symbols()
+    ase_structs[1].pop()
+    with pytest.raises(ValueError):
+        CrystalParser.get_trajectory(ase_structs)
+
+
+def test_crystal_parser_remote_wavefunction(crystal_calc_node, tmpdir):
+    import os
+    from hashlib import md5
+    import numpy as np
+    from aiida_crystal_dft.data.wavefunction import CrystalRemoteWavefunctionData
+    from aiida_crystal_dft.io.f9 import Fort9
+    from aiida_crystal_dft.parsers.crystal import CrystalParser
+    from aiida_crystal_dft.tests import TEST_DIR
+    file_name = os.path.join(TEST_DIR, "output_files", "mgo_sto3g", "fort.9")
+    with open(file_name, 'rb') as f:
+        checksum = md5(f.read()).hexdigest()
+    # written on the remote by the job script
+    tmpdir.join('fort.9.info').write("{}\n{}\n".format(os.path.getsize(file_name), checksum))
+    calcnode = crystal_calc_node(options={'remote_wavefunction': True})
+    parser = CrystalParser(calcnode)
+    parser.parse(retrieved_temporary_folder=str(tmpdir))
+    wavefunction = parser.outputs[parser._linkname_wavefunction]
+    assert isinstance(wavefunction, CrystalRemoteWavefunctionData)
+    assert wavefunction.path == '/scratch/crystal/fort.9'
+    assert wavefunction.size == os.path.getsize(file_name)
+    assert wavefunction.checksum == checksum
+    # the metadata taken from the output are the same as in fort.9
+    expected = Fort9(file_name).get_metadata()
+    assert wavefunction.metadata["ao_number"] == expected["ao_number"]
+    assert wavefunction.metadata["atomic_numbers"] == expected["atomic_numbers"]
+    assert np.allclose(wavefunction.metadata["cell"], expected["cell"], atol=1e-4)
+    assert np.allclose(wavefunction.metadata["positions"], expected["positions"], atol=1e-4)
+
+
+def test_crystal_parser_remote_wavefunction_no_metadata(crystal_calc_node, monkeypatch):
+    from aiida_crystal_dft.io.out import OutFileParser
+    from aiida_crystal_dft.parsers.crystal import CrystalParser
+    monkeypatch.setattr(OutFileParser, 'get_wavefunction_metadata', lambda self: None)
+    calcnode = crystal_calc_node(options={'remote_wavefunction': True})
+    parser = CrystalParser(calcnode)
+    exit_code = parser.parse()
+    assert exit_code.status == 402
+    assert parser._linkname_wavefunction not in parser.outputs
@@ -20,3 +20,12 @@ def test_properties_parser(properties_calc_node):
     assert isinstance(nodes[parser._linkname_dos], DataFactory("array"))
     assert nodes[parser._linkname_dos].get_arraynames() == ["dos", ]
     assert nodes[parser._linkname_dos].get_shape("dos") == (4, 302)
+
+
+def test_properties_parser_no_fort25(properties_calc_node):
+    from aiida_crystal_dft.parsers.properties import PropertiesParser
+    # no fort.25 is written e.g. by BOLTZTRA
+    calc_node = properties_calc_node(prefix="mgo_sto3g/scf")
+    parser = PropertiesParser(calc_node)
+    assert parser.parse() is None
+    assert not parser.outputs
@@ -1,8 +1,16 @@
 import json
 import os
+from functools import lru_cache
 
 import jsonschema
 
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+DRAFT4_URI = "http://json-schema.org/draft-04/schema#"
+
 
 def read_schema(name="d12"):
     """read and return an json schema
@@ -16,20 +24,73 @@ def read_schema(name="d12"):
     return schema
 
 
+@lru_cache(maxsize=None)
+def get_validator(name="d12"):
+    """ return jsonschema validator for the schema, created once per process
+
+    :param name: schema name
+    """
+    # by default, only validates lists
+    return jsonschema.Draft4Validator(read_schema(name), types={"array": (list, tuple)})
+
+
+@lru_cache(maxsize=None)
+def get_fast_validator(name="d12"):
+    """ return the validator for the schema compiled with fastjsonschema (once per process),
+    or None if fastjsonschema is not installed or can not compile the schema. Draft 4 is enforced
+    to agree with get_validator, as fastjsonschema falls back to the latest draft otherwise
+
+    :param name: schema name
+    """
+    if fastjsonschema is None:
+        return None
+    schema = read_schema(name)
+    schema["$schema"] = DRAFT4_URI
+    try:
+        return fastjsonschema.compile(schema)
+    except fastjsonschema.JsonSchemaDefinitionException:
+        return None
+
+
+def _to_json(data):
+    """ copy data converting tuples to lists, as fastjsonschema treats only lists as arrays """
+    if isinstance(data, dict):
+        return {k: _to_json(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_to_json(v) for v in data]
+    return data
+
+
 def validate_with_json(data, name="d12"):
     """ validate json-type data against a schema
 
     :param data: dictionary
     """
-    schema = read_schema(name)
+    fast_validator = get_fast_validator(name)
+    if fast_validator is not None:
+        try:
+            fast_validator(_to_json(data))
+            return
+        except fastjsonschema.JsonSchemaException:
+            # let jsonschema report the error
+            pass
+    get_validator(name).validate(data)
 
-    # validator = jsonschema.validators.extend(
-    #     jsonschema.Draft4Validator,
-    # )
-    validator = jsonschema.Draft4Validator
 
-    # by default, only validates lists
-    validator(schema, types={"array": (list, tuple)}).validate(data)
+def validate_many(data_list, name="d12"):
+    """ validate many json-type data items against a schema, e.g. for batch submissions
+
+    :param data_list: an iterable of dictionaries
+    :return: a list with None for valid items and jsonschema.ValidationError for invalid ones
+    """
+    errors = []
+    for data in data_list:
+        try:
+            validate_with_json(data, name)
+            errors.append(None)
+        except jsonschema.ValidationError as err:
+            errors.append(err)
+    return errors
 
 
 def validate_with_dict(data, schema):
@@ -44,4 +105,4 @@ def validate_with_dict(data, schema):
     validator = jsonschema.Draft4Validator
 
     # by default, only validates lists
-    validator(schema, types={"array": (list, tuple)}).validate(data)
\ No newline at end of file
+    validator(schema, types={"array": (list, tuple)}).validate(data)
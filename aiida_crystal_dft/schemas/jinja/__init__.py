@@ -1,13 +1,32 @@
 #   Copyright (c)  Andrey Sobolev, 2020. Distributed under MIT license, see LICENSE file.
 
 import os
-from jinja2 import Environment, FileSystemLoader
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+TEMPLATE_DIR = os.path.dirname(__file__)
+
+
+@lru_cache(maxsize=None)
+def get_environment():
+    """
+    Returns Jinja2 environment shared within the process, so that the templates are parsed and compiled only once.
+    The compiled templates are also cached on disk (in the temporary directory), so that the new processes
+    (e.g. daemon workers) load them instead of compiling
+    """
+    try:
+        bytecode_cache = FileSystemBytecodeCache()
+    except (OSError, RuntimeError):
+        # no usable temporary directory, cache the templates in memory only
+        bytecode_cache = None
+    return Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                       bytecode_cache=bytecode_cache,
+                       # templates are shipped with the package and do not change
+                       auto_reload=False,
+                       lstrip_blocks=True,
+                       trim_blocks=True,
+                       keep_trailing_newline=True)
 
 
 def get_template(schema='d12.j2'):
-    template_dir = os.path.dirname(__file__)
-    env = Environment(loader=FileSystemLoader(template_dir),
-                      lstrip_blocks=True,
-                      trim_blocks=True,
-                      keep_trailing_newline=True)
-    return env.get_template(schema)
+    return get_environment().get_template(schema)
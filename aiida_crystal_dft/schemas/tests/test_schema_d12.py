@@ -97,3 +97,40 @@ def test_full_pass():
         }
     }
     validate_with_json(data)
+
+
+def test_validate_many():
+    import time
+    import jsonschema
+    from aiida_crystal_dft.schemas import read_schema, validate_many
+    from aiida_crystal_dft.tests import d12_input
+    data_list = [d12_input, {"scf": {"k_points": (8, 8)}}, {"a": 1}] * 100
+    start = time.perf_counter()
+    errors = validate_many(data_list)
+    cached_time = time.perf_counter() - start
+    assert [err is None for err in errors[:3]] == [True, True, False]
+    assert isinstance(errors[2], ValidationError)
+    start = time.perf_counter()
+    for data in data_list:
+        try:
+            jsonschema.Draft4Validator(read_schema("d12"), types={"array": (list, tuple)}).validate(data)
+        except ValidationError:
+            pass
+    uncached_time = time.perf_counter() - start
+    print("\nValidation of {} dicts: cached validators {:.1f} ms, new validators {:.1f} ms".format(
+        len(data_list), cached_time * 1e3, uncached_time * 1e3))
+
+
+@pytest.mark.parametrize("toldeg,valid", [(0.1, True), (0, False)])
+def test_fast_validator_draft4(toldeg, valid):
+    fastjsonschema = pytest.importorskip("fastjsonschema")
+    from aiida_crystal_dft.schemas import get_fast_validator, get_validator
+    # exclusiveMinimum is boolean in draft 4 and a number in later drafts
+    data = {"scf": {"k_points": [8, 8]}, "geometry": {"optimise": {"convergence": {"TOLDEG": toldeg}}}}
+    assert get_validator().is_valid(data) is valid
+    try:
+        get_fast_validator()(data)
+        fast_valid = True
+    except fastjsonschema.JsonSchemaException:
+        fast_valid = False
+    assert fast_valid is valid
@@ -8,4 +8,4 @@ from .calculations import (
     test_mpds_structure, test_magnetic_structure, test_structure_data,
     test_structure_issue_30
 )
-from .code import mock_crystal_code, mock_properties_code
+from .code import mock_crystal_code, mock_properties_code, fake_properties_code
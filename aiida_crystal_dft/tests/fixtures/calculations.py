@@ -70,13 +70,16 @@ def crystal_calc_node(aiida_localhost, crystal_calc_inputs, calc_results):
     from aiida.orm import CalcJobNode, Dict,  StructureData
     from aiida.common.links import LinkType
 
-    def get_calcnode(files=None, prefix="mgo_sto3g"):
+    def get_calcnode(files=None, prefix="mgo_sto3g", options=None):
         process_type = 'aiida.calculations:{}'.format('crystal_dft.serial')
         node = CalcJobNode(computer=aiida_localhost, process_type=process_type)
         node.set_process_label('CrystalSerialCalculation')
         node.set_attribute('input_filename', 'INPUT')
         node.set_attribute('output_filename', 'crystal.out')
         node.set_option('resources', {'num_machines': 1, 'num_mpiprocs_per_machine': 1})
+        for option, value in (options or {}).items():
+            node.set_option(option, value)
+        node.set_remote_workdir('/scratch/crystal')
         node.add_incoming(crystal_calc_inputs.code, link_type=LinkType.INPUT_CALC, link_label='code')
         # store inputs
         for calc_input in ("structure", "parameters", "basis_family"):
@@ -116,7 +119,7 @@ def properties_calc_node(aiida_localhost, properties_calc_inputs, calc_results):
     from aiida.common.links import LinkType
     process_type = 'aiida.calculations:{}'.format('crystal_dft.properties')
 
-    def get_calcnode(files=None):
+    def get_calcnode(files=None, prefix="mgo_sto3g"):
         node = CalcJobNode(computer=aiida_localhost, process_type=process_type)
         node.set_process_label('PropertiesCalculation')
         node.set_option('resources', {'num_machines': 1, 'num_mpiprocs_per_machine': 1})
@@ -131,7 +134,7 @@ def properties_calc_node(aiida_localhost, properties_calc_inputs, calc_results):
         node.add_incoming(properties_calc_inputs.parameters, link_type=LinkType.INPUT_CALC, link_label='parameters')
         node.add_incoming(properties_calc_inputs.wavefunction, link_type=LinkType.INPUT_CALC, link_label='wavefunction')
         node.store()
-        retrieved = calc_results(files)
+        retrieved = calc_results(files, prefix)
         retrieved.add_incoming(node, link_type=LinkType.CREATE, link_label='retrieved')
         retrieved.store()
         return node
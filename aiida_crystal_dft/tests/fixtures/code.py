@@ -3,7 +3,7 @@
 
 import os
 import pytest
-from aiida_crystal_dft.tests import OUTPUT_FILES_DIR
+from aiida_crystal_dft.tests import OUTPUT_FILES_DIR, TEST_DIR
 
 
 @pytest.fixture
@@ -25,4 +25,16 @@ def mock_properties_code(mock_code_factory):
         data_dir_abspath=OUTPUT_FILES_DIR,
         entry_point='crystal_dft.properties',
         ignore_files=('_aiidasubmit.sh', )
-    )
\ No newline at end of file
+    )
+
+
+@pytest.fixture
+def fake_properties_code(aiida_localhost):
+    """Creates a properties code writing fort.25 with the blocks asked for in the input"""
+    from aiida.orm import InstalledCode
+    return InstalledCode(
+        label='fake-properties',
+        computer=aiida_localhost,
+        filepath_executable=os.path.join(TEST_DIR, 'mock_codes', 'properties'),
+        default_calc_job_plugin='crystal_dft.properties'
+    ).store()
@@ -3,7 +3,8 @@
 """
 A module containing data on electrons and oxidation states of the elements
 """
-from itertools import product
+from functools import lru_cache, reduce
+from math import gcd
 from ase.data import atomic_numbers
 
 # Common oxidation states have larger weight
@@ -210,15 +211,58 @@ def electronic_config(element, crystal_format=False, sp=False):
 def guess_oxistates(structure):
     """A function returning a dictionary of oxidation states for each element of the structure"""
     composition = structure.get_composition()
-    elements = composition.keys()
-    oxistates_element = [oxistates[atomic_numbers[el]] for el in elements]
-    weights = {state: sum([composition[el] * oxistate_weights[atomic_numbers[el]][state[i]]
-                           for i, el in enumerate(elements)])
-               for state in product(*oxistates_element)
-               if sum([x*y for x, y in zip(state, [composition[el] for el in elements])]) == 0}
-    if not weights:
+    elements = list(composition.keys())
+    # the most probable neutral state does not change when the composition is scaled
+    divisor = reduce(gcd, composition.values())
+    state = _neutral_oxistates(tuple((atomic_numbers[el], composition[el] // divisor) for el in elements))
+    if state is None:
         raise NotImplementedError("No electrically neutral state found for the following composition: {}".format(composition))
-    return dict(zip(elements, sorted(weights.items(), key=lambda x: x[1], reverse=True)[0][0]))
+    return dict(zip(elements, state))
+
+
+@lru_cache(maxsize=1024)
+def _neutral_oxistates(composition):
+    """
+    Finds the electrically neutral combination of oxidation states having the largest weight with depth-first
+    branch and bound search. Branches are cut if the partial charge can not be compensated by the rest of elements,
+    or if their weight can not exceed the best one found. Of the states with equal weights, the first one in the
+    order of itertools.product over oxidation states is returned.
+    :param composition: a tuple of (atomic number, number of atoms) pairs
+    :return: a tuple of oxidation states in the order of composition, or None if there is no neutral state
+    """
+    # the order of oxidation states in the table is kept for the tie breaking
+    choices = [list(oxistate_weights[number].items()) for number, _ in composition]
+    if not all(choices):
+        return None
+    counts = [count for _, count in composition]
+    n = len(composition)
+    # bounds of charge and weight for the elements starting from i-th
+    min_charge, max_charge, max_weight = [0] * (n + 1), [0] * (n + 1), [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        states = [state for state, _ in choices[i]]
+        min_charge[i] = min_charge[i + 1] + counts[i] * min(states)
+        max_charge[i] = max_charge[i + 1] + counts[i] * max(states)
+        max_weight[i] = max_weight[i + 1] + counts[i] * max(weight for _, weight in choices[i])
+    best = [None, None]
+    state = [0] * n
+
+    def search(i, charge, weight):
+        if i == n:
+            if best[0] is None or weight > best[0]:
+                best[:] = [weight, tuple(state)]
+            return
+        for ox_state, ox_weight in choices[i]:
+            new_charge = charge + counts[i] * ox_state
+            new_weight = weight + counts[i] * ox_weight
+            if not min_charge[i + 1] <= -new_charge <= max_charge[i + 1]:
+                continue
+            if best[0] is not None and new_weight + max_weight[i + 1] <= best[0]:
+                continue
+            state[i] = ox_state
+            search(i + 1, new_charge, new_weight)
+
+    search(0, 0, 0)
+    return best[1]
 
 
 def guess_spinlock(structure):
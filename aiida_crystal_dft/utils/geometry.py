@@ -2,8 +2,8 @@
 """Utility functions for facilitating working with geometry
 """
 import numpy as np
-import spglib
 from ase import Atoms
+from aiida_crystal_dft.utils import symmetry
 
 
 SYMPREC = 1e-04
@@ -22,7 +22,7 @@ CRYSTAL_TYPE_MAP = {
 def get_spacegroup(cell, positions, numbers, symprec=None):
     """Returns Pearson symbol and intl number corresponding to the given structure"""
     cell = (cell, positions, numbers)
-    sg = spglib.get_spacegroup(cell, symprec=symprec or SYMPREC).split()
+    sg = symmetry.get_spacegroup(cell, symprec=symprec or SYMPREC).split()
     return sg[0], int(sg[1][1:-1])
 
 
@@ -144,7 +144,7 @@ def to_primitive(structure):
     positions = ase_struct.get_scaled_positions()
     numbers = ase_struct.get_atomic_numbers()
     cell_tuple = (cell, positions, numbers)
-    primitive = spglib.find_primitive(cell_tuple)
+    primitive = symmetry.find_primitive(cell_tuple)
     cell, positions, numbers = primitive
     ase_struct = Atoms(numbers, scaled_positions=positions, cell=cell, pbc=True)
     return StructureData(ase=ase_struct)
@@ -10,6 +10,7 @@ except ImportError:
     from fractions import gcd
 
 from functools import reduce
+from . import symmetry
 from .geometry import get_lattice_type, get_spacegroup
 
 
@@ -141,7 +142,9 @@ def get_kpoints_path(structure):
     from aiida.plugins import DataFactory
     from aiida.tools import get_kpoints_path
     if isinstance(structure, DataFactory('structure')):
-        result = get_kpoints_path(structure)["parameters"].get_dict()
+        ase_struct = structure.get_ase()
+        cell = (ase_struct.get_cell(), ase_struct.get_scaled_positions(), ase_struct.get_atomic_numbers())
+        result = symmetry.get_kpoints_path(cell, lambda c, s: get_kpoints_path(structure)["parameters"].get_dict())
         return result["point_coords"], result["path"]
     else:
         raise ValueError("structure in the call to get_kpoints_path must be of StructureData type")
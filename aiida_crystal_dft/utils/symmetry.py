@@ -0,0 +1,118 @@
+#  Copyright (c)  Andrey Sobolev, 2019. Distributed under MIT license, see LICENSE file.
+"""A cache of spglib results. The same structure goes through spglib several times while a calculation
+is prepared (fort.34 writing, spinlock guessing, k-points path), so the standardized and primitive cells
+and symmetry datasets are kept keyed by the hash of (cell, positions, numbers, symprec)
+"""
+from collections import OrderedDict
+from copy import deepcopy
+from hashlib import sha1
+
+import numpy as np
+import spglib
+
+# spglib default
+SYMPREC = 1e-05
+CACHE_SIZE = 256
+
+_cache = OrderedDict()
+
+
+def cell_hash(cell, symprec=SYMPREC):
+    """
+    Returns the canonical hash of the cell in spglib sense
+    :param cell: a tuple of (lattice vectors, fractional positions, atomic numbers)
+    :param symprec: symmetry tolerance
+    :return: hex digest string
+    """
+    lattice, positions, numbers = cell
+    digest = sha1(np.ascontiguousarray(lattice, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(positions, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(numbers, dtype=np.int64).tobytes())
+    digest.update(repr(float(symprec)).encode())
+    return digest.hexdigest()
+
+
+def cached(name, cell, func, symprec=SYMPREC):
+    """
+    Returns the result of func(cell, symprec) from the cache, calling it on a cache miss
+    :param name: the name of the result kind, e.g. 'primitive'
+    :param cell: a cell in spglib sense
+    :param func: a function of cell and symprec
+    :param symprec: symmetry tolerance
+    """
+    key = (name, cell_hash(cell, symprec))
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    result = func(cell, symprec)
+    _cache[key] = result
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
+
+
+def clear_cache():
+    """Empties the cache"""
+    _cache.clear()
+
+
+def _copy_cell(cell):
+    """Cached cells are copied, so that they are not changed in place"""
+    if cell is None:
+        return None
+    return tuple(np.array(x) for x in cell)
+
+
+def standardize_cell(cell, to_primitive=False, symprec=SYMPREC):
+    """Cached version of spglib.standardize_cell (with idealization)"""
+    def standardize(c, s):
+        return spglib.standardize_cell(c, to_primitive=to_primitive, no_idealize=False, symprec=s)
+    name = "primitive_standard" if to_primitive else "conventional_standard"
+    return _copy_cell(cached(name, cell, standardize, symprec))
+
+
+def find_primitive(cell, symprec=SYMPREC):
+    """Cached version of spglib.find_primitive"""
+    return _copy_cell(cached("primitive", cell, lambda c, s: spglib.find_primitive(c, symprec=s), symprec))
+
+
+def get_symmetry_dataset(cell, symprec=SYMPREC):
+    """Cached version of spglib.get_symmetry_dataset. The dataset is shared and should not be changed"""
+    return cached("dataset", cell, lambda c, s: spglib.get_symmetry_dataset(c, symprec=s), symprec)
+
+
+def get_spacegroup(cell, symprec=SYMPREC):
+    """Cached version of spglib.get_spacegroup"""
+    return cached("spacegroup", cell, lambda c, s: spglib.get_spacegroup(c, symprec=s), symprec)
+
+
+def get_kpoints_path(cell, func):
+    """Returns the (deep-copied) k-points path found for the cell by func(cell, symprec), see utils.kpoints"""
+    return deepcopy(cached("kpoints_path", cell, func))
+
+
+def symmetry_hash(cell, symprec=SYMPREC, decimals=6):
+    """
+    Returns the hash of the cell which is invariant to the choice of unit cell, origin and atom order.
+    The standardized primitive cell is taken, then each atom of the least abundant element is tried as the origin,
+    and the smallest of the sorted rounded positions is hashed
+    :param cell: a cell in spglib sense
+    :param symprec: symmetry tolerance
+    :param decimals: the number of decimals to round lattice vectors and positions to
+    :return: hex digest string
+    """
+    primitive = standardize_cell(cell, to_primitive=True, symprec=symprec)
+    if primitive is None:
+        # spglib failed to find symmetry, fall back to the cell itself
+        primitive = tuple(np.array(x) for x in cell)
+    lattice, positions, numbers = primitive
+    lattice = np.round(lattice, decimals) + 0.
+    species, counts = np.unique(numbers, return_counts=True)
+    origin_species = species[np.argmin(counts)]
+    candidates = []
+    for origin in positions[numbers == origin_species]:
+        shifted = np.round(np.round(positions - origin, decimals) % 1., decimals) + 0.
+        order = np.lexsort(np.vstack([shifted.T[::-1], numbers]))
+        candidates.append((shifted[order].tobytes(), shifted[order], numbers[order]))
+    _, positions, numbers = min(candidates, key=lambda x: x[0])
+    return cell_hash((lattice, positions, numbers), symprec)
@@ -23,6 +23,41 @@ def test_guess_oxistates(test_structure_data):
     assert guess_oxistates(test_structure_data) == {"Mg": 2, "O": -2}
 
 
+def test_oxistates_solver():
+    """Compares the oxidation states solver with exhaustive search over a corpus of compositions"""
+    import time
+    from itertools import product
+    from ase.data import atomic_numbers
+    from aiida_crystal_dft.utils.electrons import _neutral_oxistates, oxistates, oxistate_weights
+
+    def exhaustive(composition):
+        weights = {state: sum([n * oxistate_weights[z][state[i]] for i, (z, n) in enumerate(composition)])
+                   for state in product(*[oxistates[z] for z, _ in composition])
+                   if sum([x * n for x, (_, n) in zip(state, composition)]) == 0}
+        if not weights:
+            return None
+        return sorted(weights.items(), key=lambda x: x[1], reverse=True)[0][0]
+
+    corpus = [
+        {"Mg": 1, "O": 1}, {"Fe": 2, "O": 3}, {"Fe": 3, "O": 4}, {"Ca": 1, "Ti": 1, "O": 3},
+        {"Li": 1, "Fe": 1, "P": 1, "O": 4}, {"Y": 1, "Ba": 2, "Cu": 3, "O": 7}, {"Cu": 2, "Zn": 1, "Sn": 1, "S": 4},
+        {"La": 1, "Sr": 1, "Mn": 2, "O": 6}, {"K": 1, "Mn": 1, "O": 4}, {"Bi": 1, "Fe": 1, "O": 3},
+        {"Na": 1, "Co": 1, "Ni": 1, "Mn": 1, "O": 4}, {"Er": 1, "Hg": 1}, {"Ar": 1, "Fe": 1}, {"He": 1, "O": 1},
+        {"Li": 2, "Mn": 1, "Fe": 1, "Cr": 1, "Co": 1, "O": 8}, {"Os": 1, "Ir": 1, "Ru": 1, "C": 2, "N": 2},
+    ]
+    compositions = [tuple((atomic_numbers[el], n) for el, n in comp.items()) for comp in corpus]
+    start = time.perf_counter()
+    expected = [exhaustive(comp) for comp in compositions]
+    exhaustive_time = time.perf_counter() - start
+    _neutral_oxistates.cache_clear()
+    start = time.perf_counter()
+    found = [_neutral_oxistates(comp) for comp in compositions]
+    solver_time = time.perf_counter() - start
+    assert found == expected
+    print("\nOxidation states for {} compositions: exhaustive {:.2f} ms, solver {:.2f} ms".format(
+        len(compositions), exhaustive_time * 1e3, solver_time * 1e3))
+
+
 @pytest.mark.skip
 def test_guess_oxistates_mpds(test_mpds_structure):
     from aiida_crystal_dft.utils.electrons import guess_oxistates
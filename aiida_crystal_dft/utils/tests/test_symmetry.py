@@ -0,0 +1,43 @@
+#  Copyright (c)  Andrey Sobolev, 2019. Distributed under MIT license, see LICENSE file.
+"""
+Tests for spglib results cache
+"""
+import time
+import numpy as np
+import spglib
+from ase.build import bulk
+
+
+def test_cell_hash():
+    from aiida_crystal_dft.utils.symmetry import cell_hash
+    atoms = bulk("MgO", "rocksalt", a=4.21, cubic=True)
+    cell = (atoms.get_cell(), atoms.get_scaled_positions(), atoms.get_atomic_numbers())
+    same_cell = (np.array(atoms.get_cell()), atoms.get_scaled_positions().copy(), list(atoms.get_atomic_numbers()))
+    assert cell_hash(cell) == cell_hash(same_cell)
+    assert cell_hash(cell) != cell_hash(cell, symprec=1e-3)
+    atoms.rattle(1e-3)
+    assert cell_hash(cell) != cell_hash((atoms.get_cell(), atoms.get_scaled_positions(), atoms.get_atomic_numbers()))
+
+
+def test_symmetry_cache():
+    from aiida_crystal_dft.utils import symmetry
+    symmetry.clear_cache()
+    atoms = bulk("Si", "diamond", a=5.43, cubic=True).repeat((3, 3, 3))
+    atoms.rattle(1e-2, seed=1)
+    cell = (atoms.get_cell(), atoms.get_scaled_positions(), atoms.get_atomic_numbers())
+    start = time.perf_counter()
+    primitive = symmetry.find_primitive(cell)
+    miss_time = time.perf_counter() - start
+    start = time.perf_counter()
+    cached_primitive = symmetry.find_primitive(cell)
+    hit_time = time.perf_counter() - start
+    for x, y, z in zip(primitive, cached_primitive, spglib.find_primitive(cell)):
+        assert np.array_equal(x, y)
+        assert np.array_equal(x, z)
+    # cached cells are not changed in place
+    cached_primitive[1][:] = 0
+    assert np.array_equal(symmetry.find_primitive(cell)[1], primitive[1])
+    assert symmetry.get_symmetry_dataset(cell) is symmetry.get_symmetry_dataset(cell)
+    assert symmetry.get_spacegroup(cell) == spglib.get_spacegroup(cell)
+    print("\nfind_primitive for {} atoms: {:.2f} ms, cached {:.3f} ms".format(len(atoms), miss_time * 1e3,
+                                                                              hit_time * 1e3))
@@ -1,5 +1,6 @@
 """ Base workflows for the CRYSTAL code. Handles the failures, restarts, etc.
 """
+from copy import deepcopy
 
 from aiida.plugins import CalculationFactory
 from aiida.orm import Code, Bool, Dict, Int
@@ -8,6 +9,10 @@ from aiida.engine import WorkChain, append_, while_
 from aiida_crystal_dft.utils import get_data_node, get_data_class, not_
 from aiida_crystal_dft.utils.kpoints import get_shrink_kpoints_path
 from aiida_crystal_dft.utils.dos import get_dos_projections_atoms
+from aiida_crystal_dft.io.d3 import split_parameters
+from aiida_crystal_dft.workflows.restart import RESTART_HANDLERS, get_handler
+from aiida_crystal_dft.workflows.resources import ResourcePolicy, SCALED_EXIT_STATUSES, estimate_memory_kb, \
+    get_ao_number
 
 
 DEFAULT_TITLE = 'CRYSTAL run by AiiDA'
@@ -34,6 +39,9 @@ class BaseCrystalWorkChain(WorkChain):
         spec.input('clean_workdir', valid_type=get_data_class('bool'),
                    required=False, default=lambda: get_data_node('bool', False))
         spec.input('options', valid_type=get_data_class('dict'), required=True, help="Calculation options")
+        spec.input('restart_folder', valid_type=get_data_class('remote'), required=False,
+                   help="Remote folder of a previous calculation on the same structure, "
+                        "which wave function is used as the initial guess")
 
         # define workchain routine
         spec.outline(cls.init_inputs,
@@ -49,7 +57,9 @@ class BaseCrystalWorkChain(WorkChain):
         spec.output('output_structure', valid_type=get_data_class('structure'), required=False)
         spec.output('primitive_structure', valid_type=get_data_class('structure'), required=False)
         spec.output('output_parameters', valid_type=get_data_class('dict'), required=False)
-        spec.output('output_wavefunction', valid_type=get_data_class('singlefile'), required=False)
+        spec.output('output_wavefunction', valid_type=(get_data_class('singlefile'),
+                                                       get_data_class('crystal_dft.wavefunction.remote')),
+                    required=False)
         spec.output('output_trajectory', valid_type=get_data_class('array.trajectory'), required=False)
         spec.output('oxidation_states', valid_type=get_data_class('dict'), required=False)
 
@@ -65,6 +75,8 @@ class BaseCrystalWorkChain(WorkChain):
         self.ctx.inputs.code = self.inputs.code
         self.ctx.inputs.parameters = self.inputs.parameters
         self.ctx.inputs.basis_family = self.inputs.basis_family
+        if 'restart_folder' in self.inputs:
+            self.ctx.inputs.restart_folder = self.inputs.restart_folder
         self.ctx.is_restart = False
         self.ctx.restart_params = self.inputs.restart_params
         label = self.inputs.metadata.get('label', DEFAULT_TITLE)
@@ -80,6 +92,10 @@ class BaseCrystalWorkChain(WorkChain):
             self.ctx.inputs.use_oxistates = Dict(dict=use_oxi)
         self.ctx.high_spin_preferred = options_dict.pop('high_spin_preferred', False)
 
+        # restarts
+        self.ctx.max_restarts = options_dict.pop('max_restarts', self._number_restarts)
+        self.ctx.restart_handlers = options_dict.pop('restart_handlers', sorted(RESTART_HANDLERS))
+
         # magnetism
         is_magnetic = options_dict.pop('is_magnetic', False)
         if is_magnetic:
@@ -87,17 +103,50 @@ class BaseCrystalWorkChain(WorkChain):
             self.ctx.inputs.is_magnetic = Bool(True)
             self.ctx.inputs.spinlock_steps = Int(options_dict.pop('spinlock_steps', 5))
 
+        # resources
+        resource_policy = options_dict.pop('resource_policy', None)
+        self.ctx.resource_policy = None
+        if resource_policy:
+            self.ctx.resource_policy = resource_policy if isinstance(resource_policy, dict) else {}
+            memory_kb = self._estimate_memory(is_magnetic)
+            options_dict = self.get_resource_policy().initial_options(options_dict, memory_kb)
+            self.report(f'{label}: estimated memory per process {memory_kb} kB, '
+                        f'using resources {options_dict["resources"]}')
+
         # get calculation entry_point
-        try:
-            self.ctx.calculation = self._parallel_calculation \
-                if (options_dict['resources']['num_machines'] > 1
-                    or options_dict['resources']['num_mpiprocs_per_machine'] > 1) else self._serial_calculation
-        except KeyError:
-            self.ctx.calculation = self._parallel_calculation
+        self.ctx.calculation = self._get_calculation(options_dict)
 
         # remaining options are passed down to calculations
         self.ctx.options = options_dict
 
+    @classmethod
+    def _get_calculation(cls, options):
+        """Returns calculation entry point for the given options"""
+        try:
+            return cls._parallel_calculation \
+                if (options['resources']['num_machines'] > 1
+                    or options['resources']['num_mpiprocs_per_machine'] > 1) else cls._serial_calculation
+        except KeyError:
+            return cls._parallel_calculation
+
+    def get_resource_policy(self):
+        """Returns the resource policy for the code computer or None if the policy is not used"""
+        if self.ctx.resource_policy is None:
+            return None
+        return ResourcePolicy(self.inputs.code.computer, **self.ctx.resource_policy)
+
+    def _estimate_memory(self, is_magnetic):
+        """Estimates the memory needed by CRYSTAL process from the number of AOs and atoms"""
+        structure = self.inputs.structure
+        scf = self.inputs.parameters.get_dict()['scf']
+        spin = is_magnetic or scf.get('single') == 'UHF' or scf.get('dft', {}).get('SPIN', False)
+        return estimate_memory_kb(get_ao_number(structure, self.inputs.basis_family), len(structure.sites),
+                                  scf['k_points'], spin)
+
+    def _uses_resource_policy(self, exit_status):
+        """Check if the failure with the exit status is handled by scaling resources"""
+        return self.ctx.resource_policy is not None and exit_status in SCALED_EXIT_STATUSES
+
     def init_calculation(self):
         if not self.ctx.is_restart:
             self._init_calculation()
@@ -126,25 +175,69 @@ class BaseCrystalWorkChain(WorkChain):
                                                   'description': description})
 
     def _restart_calculation(self):
+        """Amend the inputs of the failed calculation, continuing from its last geometry and wave function"""
         self.ctx.running_calc += 1
         last_calc = self.ctx.calculations[-1]
-        self.report(f'Remote folder: {last_calc.get_outgoing().get_node_by_label("remote_folder")}')
-        self.ctx.inputs.parameters = get_data_class('dict')(dict=self.ctx.restart_params[str(last_calc.exit_status)])
+        exit_status = last_calc.exit_status
+        if str(exit_status) in self.ctx.restart_params.keys():
+            # explicitly given restart parameters take precedence over the resource policy and the handlers
+            parameters = self.ctx.restart_params[str(exit_status)]
+        elif self._uses_resource_policy(exit_status):
+            parameters = self.ctx.inputs.parameters.get_dict()
+            self.ctx.options = self.get_resource_policy().scale(self.ctx.options)
+            self.ctx.calculation = self._get_calculation(self.ctx.options)
+            self.report(f'Scaling resources to {self.ctx.options["resources"]}')
+        else:
+            parameters = self.ctx.inputs.parameters.get_dict()
+            self.ctx.options = deepcopy(self.ctx.options)
+            get_handler(exit_status)(parameters, self.ctx.options, self.ctx.running_calc - 1)
+            # the handler might have changed the resources, so that serial run becomes parallel
+            self.ctx.calculation = self._get_calculation(self.ctx.options)
+        self.ctx.inputs.parameters = get_data_class('dict')(dict=parameters)
+
+        # continue optimisation from the last geometry
+        if parameters.get('geometry', {}).get('optimise') and 'output_trajectory' in last_calc.outputs:
+            trajectory = last_calc.outputs.output_trajectory
+            self.ctx.inputs.structure = trajectory.get_step_structure(trajectory.numsteps - 1)
+            self.report(f'Restarting from the last geometry of trajectory {trajectory.pk}')
+
+        # the wave function is retrieved (or referenced) if it has been written, so it should be in the remote folder
+        if 'remote_folder' in last_calc.outputs and self._has_wavefunction(last_calc):
+            self.report(f'Restarting from the wave function in remote folder {last_calc.outputs.remote_folder.pk}')
+            self.ctx.inputs.restart_folder = last_calc.outputs.remote_folder
+
         label = self.inputs.metadata.get('label', DEFAULT_TITLE)
         description = self.inputs.metadata.get('description', '')
         self.ctx.inputs.metadata = AttributeDict({'options': self.ctx.options,
                                                   'label': '{} [{}] - restart'.format(label, self.ctx.running_calc),
                                                   'description': description})
-        # self.ctx.inputs.remote_folder = last_calc.get_outgoing().get_node_by_label('remote_folder')
+
+    @staticmethod
+    def _has_wavefunction(calculation):
+        """Check if the calculation has written fort.9"""
+        if 'output_wavefunction' in calculation.outputs:
+            return True
+        if 'retrieved' in calculation.outputs and 'fort.9' in calculation.outputs.retrieved.list_object_names():
+            return True
+        # fort.9 retrieved only for parsing is not kept, but it is written even if SCF has not converged
+        return calculation.exit_status == 300 and \
+            'fort.9' in (calculation.get_retrieve_temporary_list() or [])
 
     def can_restart(self):
-        return str(self.ctx.calculations[-1].exit_status) in list(self.ctx.restart_params.keys())
+        """Check if the last calculation failed with the exit status having restart parameters or handler,
+        or if the resources can be scaled"""
+        exit_status = self.ctx.calculations[-1].exit_status
+        if str(exit_status) in self.ctx.restart_params.keys():
+            return True
+        if self._uses_resource_policy(exit_status):
+            return self.get_resource_policy().scale(self.ctx.options) is not None
+        return exit_status in self.ctx.restart_handlers and get_handler(exit_status) is not None
 
     def runnable(self):
         """Check if calculation is runnable, either as the original or as the restart"""
         if "calculations" not in self.ctx:
             return True  # if no calculations have run
-        return self.ctx.running_calc < 2 and self.can_restart()
+        return self.ctx.running_calc <= self.ctx.max_restarts and self.can_restart()
 
     def run_calculation(self):
         """Run a calculation from self.ctx.inputs"""
@@ -154,9 +247,11 @@ class BaseCrystalWorkChain(WorkChain):
 
     def check_results(self):
         """Check the calculation results, amend calculation inputs and make it restart if needed"""
-        if not self.ctx.is_restart and self.can_restart():
+        if self.can_restart() and self.ctx.running_calc <= self.ctx.max_restarts:
             self.ctx.is_restart = True
-            self.report('Calculation is not converged and restart parameters are given: calc scheduled for restart')
+            last_calc = self.ctx.calculations[-1]
+            self.report(f'Calculation failed with exit status {last_calc.exit_status}: '
+                        f'restart {self.ctx.running_calc} of {self.ctx.max_restarts} scheduled')
 
     def retrieve_results(self):
         """Process calculation results; adapted from aiida_vasp"""
@@ -188,6 +283,11 @@ class BaseCrystalWorkChain(WorkChain):
             return
         cleaned_calcs = []
         for calculation in self.ctx.calculations:
+            # the remote folder holds the only copy of the wavefunction referenced by the output
+            if 'output_wavefunction' in calculation.outputs and isinstance(
+                    calculation.outputs.output_wavefunction, get_data_class('crystal_dft.wavefunction.remote')):
+                self.report('Keeping remote folder of calculation {} with the wavefunction'.format(calculation))
+                continue
             try:
                 # noinspection PyProtectedMember
                 calculation.outputs.remote_folder._clean()
@@ -209,9 +309,17 @@ class BasePropertiesWorkChain(WorkChain):
 
         # define inputs
         spec.input('code', valid_type=Code)
-        spec.input('wavefunction', valid_type=get_data_class('singlefile'), required=True)
+        spec.input('wavefunction', valid_type=(get_data_class('singlefile'),
+                                               get_data_class('crystal_dft.wavefunction.remote')), required=True)
         spec.input('parameters', valid_type=get_data_class('dict'), required=True)
         spec.input('options', valid_type=get_data_class('dict'), required=True, help="Calculation options")
+        spec.input('fan_out', valid_type=get_data_class('bool'), required=False,
+                   default=lambda: get_data_node('bool', False),
+                   help="Run independent blocks of parameters as concurrent calculations sharing the wavefunction")
+        spec.input('wavefunction_transfer', valid_type=get_data_class('str'), required=False,
+                   default=lambda: get_data_node('str', 'copy'), validator=cls._validate_wavefunction_transfer,
+                   help="How the calculation gets fort.9 (see wavefunction_transfer option of properties "
+                        "calculation); by default it is copied on the remote, if possible")
 
         # define workchain routine
         spec.outline(cls.init_calculation,
@@ -222,6 +330,12 @@ class BasePropertiesWorkChain(WorkChain):
         spec.output('output_bands', valid_type=get_data_class('array.bands'), required=False)
         spec.output('output_dos', valid_type=get_data_class('array'), required=False)
 
+    @classmethod
+    def _validate_wavefunction_transfer(cls, value, port):
+        if value is not None:
+            # noinspection PyProtectedMember
+            return CalculationFactory(cls._calculation)._validate_wavefunction_transfer(value.value, port)
+
     def init_calculation(self):
         """Create input dictionary for the calculation, deal with restart (later?)"""
         self.ctx.inputs = AttributeDict()
@@ -240,6 +354,14 @@ class BasePropertiesWorkChain(WorkChain):
             options_dict = self.inputs.options.get_dict()
             label = options_dict.pop('label', DEFAULT_TITLE)
             description = options_dict.pop('description', '')
+            # the options shared with CRYSTAL (e.g. in RunCryWorkChain) might not apply to properties calculation
+            option_ports = CalculationFactory(self._calculation).spec().inputs['metadata']['options']
+            ignored = sorted(key for key in options_dict if key not in option_ports)
+            if ignored:
+                self.report('Ignoring options not applicable to properties calculation: {}'.format(
+                    ', '.join(ignored)))
+            options_dict = {key: value for key, value in options_dict.items() if key not in ignored}
+            options_dict.setdefault('wavefunction_transfer', self.inputs.wavefunction_transfer.value)
             self.ctx.inputs.metadata = AttributeDict({'options': options_dict,
                                                       'label': label,
                                                       'description': description})
@@ -248,9 +370,7 @@ class BasePropertiesWorkChain(WorkChain):
         """Set defaults to calculation parameters"""
         parameters_dict = parameters.get_dict()
         from aiida_crystal_dft.io.f9 import Fort9
-        with self.inputs.wavefunction.open(mode='rb') as f:
-            file_name = f.name
-        wf = Fort9(file_name)
+        wf = Fort9.from_node(self.inputs.wavefunction)
         if 'band' in parameters_dict:
 
             # automatic generation of k-point path
@@ -283,23 +403,33 @@ class BasePropertiesWorkChain(WorkChain):
         return get_data_class('dict')(dict=parameters_dict)
 
     def run_calculation(self):
-        """Run a calculation from self.ctx.inputs"""
+        """Run a calculation from self.ctx.inputs, or a calculation per independent block of parameters"""
         process = CalculationFactory(self._calculation)
-        running = self.submit(process, **self.ctx.inputs)
-        return self.to_context(calculations=append_(running))
+        if not self.inputs.fan_out:
+            running = self.submit(process, **self.ctx.inputs)
+            return self.to_context(calculations=append_(running))
+        for name, parameters in split_parameters(self.ctx.inputs.parameters.get_dict()):
+            inputs = AttributeDict(self.ctx.inputs)
+            inputs.parameters = get_data_class('dict')(dict=parameters)
+            inputs.metadata = AttributeDict(self.ctx.inputs.metadata)
+            inputs.metadata.label = '{} [{}]'.format(inputs.metadata.label, name)
+            running = self.submit(process, **inputs)
+            self.report('Submitted {} calculation <{}>'.format(name, running.pk))
+            self.to_context(calculations=append_(running))
 
     def retrieve_results(self):
-        """Process calculation results; adapted from aiida_vasp"""
-        # return the results of the last calculation
-        last_calc = self.ctx.calculations[-1]
+        """Process calculation results, merging the outputs of concurrent calculations; adapted from aiida_vasp"""
+        calculations = self.ctx.calculations if self.inputs.fan_out else self.ctx.calculations[-1:]
+        for calc in calculations:
+            if not calc.is_finished_ok:
+                self.report('Calculation <{}> failed with exit status {}'.format(calc.pk, calc.exit_status))
         for name, port in self.spec().outputs.items():
-            if port.required and name not in last_calc.outputs:
+            producers = [calc for calc in calculations if name in calc.outputs]
+            if port.required and not producers:
                 self.report('the spec specifies the output {} as required '
-                            'but was not an output of {}<{}>'.format(name, self._calculation.__name__,
-                                                                     last_calc.pk))
+                            'but was not an output of {}'.format(name, ', '.join(
+                                '{}<{}>'.format(calc.process_label, calc.pk) for calc in calculations)))
 
-            if name in last_calc.outputs:
-                # node = last_calc.outputs[name]
-                self.out(name, last_calc.outputs[name])
-                # self.report("attaching the node {}<{}> as '{}'".format(node.__class__.__name__, node.pk, name))
+            if producers:
+                self.out(name, producers[0].outputs[name])
         return
@@ -0,0 +1,170 @@
+#  Copyright (c)  Andrey Sobolev, 2020. Distributed under MIT license, see LICENSE file.
+"""
+Batch submission of BaseCrystalWorkChain for many structures sharing code, parameters, basis family and options
+"""
+import time
+
+import jsonschema
+from ase.data import chemical_symbols
+from aiida.common.extendeddicts import AttributeDict
+from aiida.engine import submit
+from aiida.orm import Dict, QueryBuilder, WorkChainNode
+from aiida_crystal_dft.data.basis_family import CrystalBasisFamilyData, BASIS_FAMILY_KWDS
+from aiida_crystal_dft.schemas import validate_with_json
+from aiida_crystal_dft.utils.symmetry import symmetry_hash
+from aiida_crystal_dft.workflows.base import BaseCrystalWorkChain, DEFAULT_TITLE
+
+ACTIVE_PROCESS_STATES = ('created', 'waiting', 'running')
+
+
+class BatchSubmission(object):
+
+    def __init__(self, code, parameters, basis_family, options, label=DEFAULT_TITLE):
+        """
+        The submission of BaseCrystalWorkChain for a batch of structures. The shared inputs are validated
+        and stored once, so that all the workchains use the same nodes
+        :param code: CRYSTAL code
+        :param parameters: Dict or dict with calculation parameters
+        :param basis_family: CrystalBasisFamilyData instance or its name
+        :param options: Dict or dict with calculation options
+        :param label: the label prefix of the workchains
+        """
+        self.code = code
+        self.parameters = parameters if isinstance(parameters, Dict) else Dict(dict=parameters)
+        if isinstance(basis_family, CrystalBasisFamilyData):
+            self.basis_family = basis_family
+        elif basis_family in BASIS_FAMILY_KWDS:
+            self.basis_family, _ = CrystalBasisFamilyData.get_or_create(basis_family)
+        else:
+            # noinspection PyProtectedMember
+            found = CrystalBasisFamilyData._get(basis_family)
+            if not found:
+                raise ValueError("Basis family {} not found".format(basis_family))
+            self.basis_family = found[0]
+        self.options = options if isinstance(options, Dict) else Dict(dict=options)
+        self.label = label
+        self.timings = {}
+
+    def prevalidate(self):
+        """Validates the shared inputs once for all the structures and stores them"""
+        start = time.perf_counter()
+        try:
+            validate_with_json(self.parameters.get_dict(), name="d12")
+        except jsonschema.ValidationError as err:
+            raise ValueError("Calculation parameters are not valid: {}".format(err))
+        if 'resources' not in self.options.get_dict():
+            raise ValueError("Calculation options must contain resources")
+        for node in (self.parameters, self.options):
+            if not node.is_stored:
+                node.store()
+        self.timings['prevalidation'] = time.perf_counter() - start
+
+    def elements(self):
+        """Returns the set of elements having basis sets in the family"""
+        if self.basis_family.predefined:
+            return {chemical_symbols[n] for n in BASIS_FAMILY_KWDS[self.basis_family.name]}
+        return set(self.basis_family.element_index)
+
+    def unique_structures(self, structures):
+        """
+        Removes duplicates from structures, comparing their symmetry-invariant hashes, and checks that the basis
+        family contains all the elements
+        :param structures: an iterable of StructureData
+        :return: a list of unique structures; a dict with indices of duplicate structures as keys and indices of
+        the structures they duplicate as values
+        """
+        start = time.perf_counter()
+        elements = self.elements()
+        seen = {}
+        unique = []
+        duplicates = {}
+        for i, structure in enumerate(structures):
+            missing = set(structure.get_composition()).difference(elements)
+            if missing:
+                raise ValueError("Basis sets for {} are not found in family {} (structure {})".format(
+                    ", ".join(sorted(missing)), self.basis_family.name, structure.get_formula()))
+            ase_struct = structure.get_ase()
+            key = symmetry_hash((ase_struct.get_cell(), ase_struct.get_scaled_positions(),
+                                 ase_struct.get_atomic_numbers()))
+            if key in seen:
+                duplicates[i] = seen[key]
+                continue
+            seen[key] = i
+            unique.append(structure)
+        self.timings['deduplication'] = time.perf_counter() - start
+        return unique, duplicates
+
+    @staticmethod
+    def active_processes():
+        """Returns the number of BaseCrystalWorkChain processes that have not terminated yet"""
+        qb = QueryBuilder()
+        qb.append(WorkChainNode, filters={
+            'process_type': BaseCrystalWorkChain.build_process_type(),
+            'attributes.process_state': {'in': ACTIVE_PROCESS_STATES}
+        })
+        return qb.count()
+
+    def _wait(self, max_active, chunk_size, poll_interval):
+        """Waits until the chunk can be submitted without exceeding max_active processes"""
+        if max_active is None:
+            return
+        while self.active_processes() + chunk_size > max_active:
+            time.sleep(poll_interval)
+
+    def submit(self, structures, chunk_size=100, max_active=None, sleep=0., poll_interval=10., dry_run=False):
+        """
+        Validates the inputs and submits the workchains in chunks
+        :param structures: an iterable of StructureData
+        :param chunk_size: the number of workchains submitted at once
+        :param max_active: if given, wait before submitting a chunk until the number of active workchains
+        allows it; the chunks are not larger than max_active
+        :param sleep: the pause between chunks, in seconds
+        :param poll_interval: the interval of checking the number of active workchains, in seconds
+        :param dry_run: validate and deduplicate structures, but do not submit
+        :return: the report containing the submitted workchains, duplicates, per stage timings and throughput
+        (submissions per second)
+        """
+        if max_active is not None:
+            if max_active < 1:
+                raise ValueError("The maximum number of active workchains must be positive")
+            chunk_size = min(chunk_size, max_active)
+        self.prevalidate()
+        structures = list(structures)
+        unique, duplicates = self.unique_structures(structures)
+        submitted = []
+        start = time.perf_counter()
+        if not dry_run:
+            for i in range(0, len(unique), chunk_size):
+                chunk = unique[i:i + chunk_size]
+                if i:
+                    time.sleep(sleep)
+                self._wait(max_active, len(chunk), poll_interval)
+                submitted += [self._submit_one(structure) for structure in chunk]
+        self.timings['submission'] = time.perf_counter() - start
+        return AttributeDict({
+            'structures': len(structures),
+            'submitted': submitted,
+            'duplicates': duplicates,
+            'timings': dict(self.timings),
+            'throughput': len(submitted) / self.timings['submission'] if submitted else 0.
+        })
+
+    def _submit_one(self, structure):
+        builder = BaseCrystalWorkChain.get_builder()
+        builder.code = self.code
+        builder.structure = structure
+        builder.parameters = self.parameters
+        builder.basis_family = self.basis_family
+        builder.options = self.options
+        builder.metadata.label = '{} {}'.format(self.label, structure.get_formula())
+        return submit(builder)
+
+
+def submit_batch(structures, code, parameters, basis_family, options, **kwargs):
+    """
+    Submits BaseCrystalWorkChain for each of the unique structures with shared inputs (see BatchSubmission.submit
+    for keyword arguments)
+    :return: the submission report
+    """
+    label = kwargs.pop('label', DEFAULT_TITLE)
+    return BatchSubmission(code, parameters, basis_family, options, label=label).submit(structures, **kwargs)
@@ -0,0 +1,148 @@
+#  Copyright (c)  Andrey Sobolev, 2020. Distributed under MIT license, see LICENSE file.
+"""
+Resource policy of BaseCrystalWorkChain. The memory needed by CRYSTAL process is estimated from the number of
+atomic orbitals and atoms before the first run, and the resources are scaled up when the calculation runs out of
+memory. Pcrystal replicates data in every MPI process, so more memory per process is got by spreading the processes
+over more machines
+"""
+from copy import deepcopy
+from math import ceil
+
+from aiida.common.log import AIIDA_LOGGER
+from aiida_crystal_dft.utils.electrons import electronic_config
+
+LOGGER = AIIDA_LOGGER.getChild('crystal_dft.resources')
+
+# the number of AOs in CRYSTAL shells by shell type: S, SP, P, D, F
+SHELL_AO_NUMBER = (1, 4, 3, 5, 7)
+SUBSHELL_AO_NUMBER = {"s": 1, "sp": 4, "p": 3, "d": 5, "f": 7}
+# the number of AOs per AO of minimal basis set in predefined basis families
+PREDEFINED_AO_FACTOR = {"STO-3G": 1, "STO-6G": 1, "POB-DZVP": 2, "POB-DZVPP": 2.5, "POB-TZVP": 3}
+# the factor for predefined basis families not listed above, overestimating rather than underestimating memory
+DEFAULT_AO_FACTOR = max(PREDEFINED_AO_FACTOR.values())
+# the memory taken by the executable and the buffers not depending on the system size, kB
+BASE_MEMORY_KB = 512 * 1024
+# complex n_AO x n_AO matrices kept for every k-point: Fock/KS, overlap, eigenvectors and density
+MATRICES_PER_KPOINT = 4
+# neighbour lists and screening data for every pair of atoms, kB
+ATOM_PAIR_MEMORY_KB = 4
+# the exit statuses handled by scaling resources (memory allocation error and neighbour list too big)
+SCALED_EXIT_STATUSES = (304, 350)
+
+
+def minimal_ao_number(element):
+    """Returns the number of AOs in minimal basis set of the element (with sp shells)"""
+    config = electronic_config(element, crystal_format=True, sp=True)
+    return sum(SUBSHELL_AO_NUMBER[orb] * len(occupations) for orb, occupations in config.items())
+
+
+def basis_ao_number(basis):
+    """Returns the number of AOs in CrystalBasisData"""
+    return sum(SHELL_AO_NUMBER[shell[0][1]] for shell in basis.get_dict()['bs'])
+
+
+def get_ao_number(structure, basis_family):
+    """
+    Returns the number of AOs in the unit cell. For predefined basis families the number is estimated from the size
+    of minimal basis set
+    :param structure: StructureData
+    :param basis_family: CrystalBasisFamilyData
+    """
+    composition = structure.get_composition()
+    if basis_family.predefined:
+        factor = PREDEFINED_AO_FACTOR.get(basis_family.name)
+        if factor is None:
+            LOGGER.warning("Unknown predefined basis family %s, assuming %s AOs per minimal basis set AO",
+                           basis_family.name, DEFAULT_AO_FACTOR)
+            factor = DEFAULT_AO_FACTOR
+        ao_numbers = {el: int(ceil(factor * minimal_ao_number(el))) for el in composition}
+    else:
+        ao_numbers = {el: basis_ao_number(basis_family.get_basis(el)) for el in composition}
+    return sum(ao_numbers[el] * n for el, n in composition.items())
+
+
+def get_kpoint_number(k_points):
+    """Returns the number of k-points for SHRINK factors, taking into account time reversal symmetry"""
+    shrink = max(k_points)
+    return shrink ** 3 // 2 + 1
+
+
+def estimate_memory_kb(ao_number, atom_number, k_points=(1, 1), spin=False):
+    """
+    Returns a rough estimate of the memory needed by one CRYSTAL process, in kB
+    :param ao_number: the number of AOs in the unit cell
+    :param atom_number: the number of atoms in the unit cell
+    :param k_points: SHRINK factors
+    :param spin: whether the calculation is spin-polarized
+    """
+    matrices = MATRICES_PER_KPOINT * get_kpoint_number(k_points) * (2 if spin else 1)
+    # complex double precision numbers
+    matrices_kb = 16 * matrices * ao_number ** 2 / 1024
+    return int(BASE_MEMORY_KB + matrices_kb + ATOM_PAIR_MEMORY_KB * atom_number ** 2)
+
+
+class ResourcePolicy(object):
+
+    def __init__(self, computer, max_machines=None, memory_per_machine_kb=None, safety_factor=1.5):
+        """
+        The policy setting resources and max_memory_kb options of CRYSTAL calculation
+        :param computer: aiida Computer the calculation is run on
+        :param max_machines: the maximum number of machines to scale to (unlimited if None)
+        :param memory_per_machine_kb: memory of one machine; the computer default is used if None
+        :param safety_factor: the factor the memory estimate is multiplied by
+        """
+        self.max_machines = max_machines
+        self.memory_per_machine_kb = memory_per_machine_kb or computer.get_default_memory_per_machine()
+        self.mpiprocs_per_machine = computer.get_default_mpiprocs_per_machine() or 1
+        self.safety_factor = safety_factor
+
+    def _get_resources(self, options):
+        resources = options.setdefault('resources', {})
+        procs = resources.get('num_mpiprocs_per_machine', self.mpiprocs_per_machine)
+        return resources, resources.get('num_machines', 1), procs
+
+    def initial_options(self, options, memory_kb):
+        """
+        Returns the copy of options with resources and max_memory_kb fitting the estimated memory; if a machine
+        can not hold the requested number of processes, they are spread over more machines
+        :param options: calculation options dict
+        :param memory_kb: the estimated memory of one process
+        """
+        options = deepcopy(options)
+        resources, machines, procs = self._get_resources(options)
+        process_memory = int(self.safety_factor * memory_kb)
+        if self.memory_per_machine_kb:
+            fitting_procs = max(1, self.memory_per_machine_kb // process_memory)
+            if procs > fitting_procs:
+                machines = int(ceil(machines * procs / fitting_procs))
+                procs = fitting_procs
+            if self.max_machines is not None:
+                machines = min(machines, self.max_machines)
+        resources['num_machines'] = machines
+        resources['num_mpiprocs_per_machine'] = procs
+        memory = procs * process_memory
+        if self.memory_per_machine_kb:
+            memory = min(memory, self.memory_per_machine_kb)
+        options['max_memory_kb'] = max(memory, options.get('max_memory_kb', 0))
+        return options
+
+    def scale(self, options):
+        """
+        Returns the copy of options with twice the memory per process or None if the resources can not be scaled.
+        The number of machines is doubled and the number of processes per machine is halved, so serial calculation
+        becomes parallel
+        :param options: calculation options dict
+        """
+        options = deepcopy(options)
+        resources, machines, procs = self._get_resources(options)
+        machines *= 2
+        if self.max_machines is not None and machines > self.max_machines:
+            return None
+        resources['num_machines'] = machines
+        resources['num_mpiprocs_per_machine'] = max(1, procs // 2)
+        if options.get('max_memory_kb'):
+            memory = 2 * options['max_memory_kb'] * resources['num_mpiprocs_per_machine'] // procs
+            if self.memory_per_machine_kb:
+                memory = min(memory, self.memory_per_machine_kb)
+            options['max_memory_kb'] = memory
+        return options
@@ -0,0 +1,71 @@
+#  Copyright (c)  Andrey Sobolev, 2020. Distributed under MIT license, see LICENSE file.
+"""
+Restart handlers of BaseCrystalWorkChain. A handler is registered for one or more exit statuses of CRYSTAL
+calculation and changes the parameters (d12 dict) and options (metadata.options dict) of the failed calculation
+in place, so that the next attempt has better chances to succeed. The attempt number (starting from 1) lets
+handlers escalate the changes.
+"""
+
+RESTART_HANDLERS = {}
+
+# CRYSTAL defaults
+DEFAULT_SCF_MAXCYCLE = 50
+DEFAULT_FMIXING = 30
+MAX_FMIXING = 90
+DEFAULT_OPT_MAXCYCLE = 100
+DEFAULT_OPT_TOLDEE = 7
+
+
+def register_handler(*exit_statuses):
+    """A decorator registering the function as the restart handler for the given exit statuses"""
+    def decorator(func):
+        for exit_status in exit_statuses:
+            RESTART_HANDLERS[exit_status] = func
+        return func
+    return decorator
+
+
+def get_handler(exit_status):
+    """Returns the restart handler for the exit status or None if there is no handler"""
+    return RESTART_HANDLERS.get(exit_status)
+
+
+@register_handler(300)
+def handle_scf_not_converged(parameters, options, attempt):
+    """
+    SCF not converged: doubles the number of SCF cycles and mixes in more of the previous Fock/KS matrix;
+    starting from the second attempt, also switches on level shifting
+    """
+    numerical = parameters['scf'].setdefault('numerical', {})
+    numerical['MAXCYCLE'] = 2 * numerical.get('MAXCYCLE', DEFAULT_SCF_MAXCYCLE)
+    numerical['FMIXING'] = min(numerical.get('FMIXING', DEFAULT_FMIXING) + 20, MAX_FMIXING)
+    if attempt > 1 and 'LEVSHIFT' not in numerical:
+        numerical['LEVSHIFT'] = [5, 1]
+
+
+@register_handler(301)
+def handle_optimisation_failed(parameters, options, attempt):
+    """
+    Geometry optimisation failed: doubles the number of optimisation steps; starting from the second attempt,
+    also tightens SCF energy convergence, so that the gradients are more accurate
+    """
+    geometry = parameters.setdefault('geometry', {})
+    if not isinstance(geometry.get('optimise'), dict):
+        geometry['optimise'] = {}
+    convergence = geometry['optimise'].setdefault('convergence', {})
+    convergence['MAXCYCLE'] = 2 * convergence.get('MAXCYCLE', DEFAULT_OPT_MAXCYCLE)
+    if attempt > 1:
+        numerical = parameters['scf'].setdefault('numerical', {})
+        numerical['TOLDEE'] = numerical.get('TOLDEE', DEFAULT_OPT_TOLDEE) + 1
+
+
+@register_handler(350)
+def handle_allocation_error(parameters, options, attempt):
+    """
+    Memory allocation error: doubles the memory limit if it is set, otherwise doubles the number of machines
+    """
+    if options.get('max_memory_kb'):
+        options['max_memory_kb'] = 2 * options['max_memory_kb']
+        return
+    resources = options.setdefault('resources', {})
+    resources['num_machines'] = 2 * resources.get('num_machines', 1)
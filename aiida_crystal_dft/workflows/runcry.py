@@ -23,6 +23,7 @@ class RunCryWorkChain(WorkChain):
         spec.input('crystal_code', valid_type=Code)
         spec.input('properties_code', valid_type=Code)
         spec.expose_inputs(BaseCrystalWorkChain, include=['structure', 'basis_family'])
+        spec.expose_inputs(BasePropertiesWorkChain, include=['fan_out', 'wavefunction_transfer'])
         spec.input('crystal_parameters', valid_type=get_data_class('parameter'), required=True)
         spec.input('properties_parameters', valid_type=get_data_class('parameter'), required=True)
         spec.input('options', valid_type=get_data_class('parameter'), required=True, help="Calculation options")
@@ -53,6 +54,8 @@ class RunCryWorkChain(WorkChain):
         self.ctx.inputs.properties.code = self.inputs.properties_code
         self.ctx.inputs.properties.parameters = self.inputs.properties_parameters
         self.ctx.inputs.properties.options = self.inputs.options
+        self.ctx.inputs.properties.fan_out = self.inputs.fan_out
+        self.ctx.inputs.properties.wavefunction_transfer = self.inputs.wavefunction_transfer
         # properties wavefunction input must be set after crystal run
 
     def run_crystal_calc(self):
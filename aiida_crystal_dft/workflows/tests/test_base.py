@@ -35,3 +35,59 @@ def test_props_wc_run(mock_properties_code, properties_calc_parameters, test_wav
         }
     })
     run(BasePropertiesWorkChain, **inputs)
+
+
+def test_props_wc_crystal_options(fake_properties_code, properties_calc_parameters, test_wavefunction):
+    from aiida_crystal_dft.workflows.base import BasePropertiesWorkChain
+    from aiida.plugins import DataFactory
+    from aiida.engine import run_get_node
+    inputs = BasePropertiesWorkChain.get_builder()
+    inputs.code = fake_properties_code
+    inputs.parameters = properties_calc_parameters
+    inputs.wavefunction = test_wavefunction
+    # the options shared with CRYSTAL workchain
+    inputs.options = DataFactory('dict')(dict={
+        'resources': {
+            'num_machines': 1,
+            'num_mpiprocs_per_machine': 1
+        },
+        'remote_wavefunction': True,
+        'try_oxi_if_fails': False
+    })
+    result, node = run_get_node(BasePropertiesWorkChain, **inputs)
+    assert node.called[0].is_finished_ok
+    assert 'output_bands' in result
+    # fort.9 is copied on the remote by default (falling back to the repository one here)
+    assert node.called[0].get_option('wavefunction_transfer') == 'copy'
+    with pytest.raises(ValueError):
+        inputs.wavefunction_transfer = DataFactory('str')('sideways')
+
+
+def test_props_wc_fan_out(fake_properties_code, properties_calc_parameters, test_wavefunction):
+    from aiida_crystal_dft.workflows.base import BasePropertiesWorkChain
+    from aiida.plugins import DataFactory
+    from aiida.engine import run_get_node
+    parameters = properties_calc_parameters.get_dict()
+    parameters['newk'] = {'k_points': [6, 6]}
+    parameters['dos'] = {'n_e': 300, 'first': 1, 'last': 14}
+    inputs = BasePropertiesWorkChain.get_builder()
+    inputs.code = fake_properties_code
+    inputs.parameters = DataFactory('dict')(dict=parameters)
+    inputs.wavefunction = test_wavefunction
+    inputs.fan_out = DataFactory('bool')(True)
+    inputs.options = DataFactory('dict')(dict={
+        'resources': {
+            'num_machines': 1,
+            'num_mpiprocs_per_machine': 1
+        }
+    })
+    result, node = run_get_node(BasePropertiesWorkChain, **inputs)
+    calcs = node.called
+    # NEWK goes with DOSS and is not run on its own
+    assert sorted(calc.label.split()[-1] for calc in calcs) == ['[band]', '[dos]']
+    assert all(calc.is_finished_ok for calc in calcs)
+    assert all(calc.inputs.wavefunction.uuid == test_wavefunction.uuid for calc in calcs)
+    # the outputs of both calculations are merged
+    assert 'output_bands' in result
+    assert 'output_dos' in result
+    assert result['output_dos'].get_shape('dos') == (4, 302)
@@ -0,0 +1,72 @@
+"""Tests for batch submission of base workflow
+"""
+
+import pytest
+
+
+def test_batch_dry_run(mock_crystal_code, crystal_calc_parameters, test_ase_structure):
+    from aiida.orm import StructureData
+    from aiida_crystal_dft.workflows.batch import BatchSubmission, submit_batch
+    # the same structure as supercell, shifted and with atoms reordered
+    shifted = test_ase_structure.repeat((1, 1, 2))
+    shifted.translate([0.3, 0.2, 0.1])
+    shifted.wrap()
+    structures = [StructureData(ase=test_ase_structure),
+                  StructureData(ase=shifted[::-1]),
+                  StructureData(ase=test_ase_structure.repeat((2, 1, 1))),
+                  StructureData(ase=test_ase_structure[:4])]
+    options = {'resources': {"num_machines": 1, "num_mpiprocs_per_machine": 1}}
+    report = submit_batch(structures, mock_crystal_code, crystal_calc_parameters, 'STO-3G', options, dry_run=True)
+    assert report.structures == 4
+    assert report.duplicates == {1: 0, 2: 0}
+    assert not report.submitted
+    assert set(report.timings.keys()) == {'prevalidation', 'deduplication', 'submission'}
+    assert crystal_calc_parameters.is_stored
+    assert BatchSubmission.active_processes() == 0
+
+
+def test_batch_prevalidation(mock_crystal_code, test_structure_data):
+    from aiida_crystal_dft.workflows.batch import BatchSubmission
+    options = {'resources': {"num_machines": 1, "num_mpiprocs_per_machine": 1}}
+    with pytest.raises(ValueError):
+        BatchSubmission(mock_crystal_code, {'scf': {'k_points': (8, 8)}}, 'NON-EXISTENT', options)
+    with pytest.raises(ValueError):
+        BatchSubmission(mock_crystal_code, {'scf': {'k_points': 'many'}}, 'STO-3G', options).prevalidate()
+    with pytest.raises(ValueError):
+        BatchSubmission(mock_crystal_code, {'scf': {'k_points': (8, 8)}}, 'STO-3G', {}).prevalidate()
+    # no Xe in STO-6G
+    test_structure_data.append_atom(position=(1., 1., 1.), symbols='Xe')
+    with pytest.raises(ValueError):
+        BatchSubmission(mock_crystal_code, {'scf': {'k_points': (8, 8)}}, 'STO-6G', options).unique_structures(
+            [test_structure_data])
+
+
+def test_batch_active_processes():
+    from aiida.orm import WorkChainNode
+    from aiida.engine import ProcessState
+    from aiida_crystal_dft.workflows.base import BaseCrystalWorkChain
+    from aiida_crystal_dft.workflows.batch import BatchSubmission
+    before = BatchSubmission.active_processes()
+    node = WorkChainNode(process_type=BaseCrystalWorkChain.build_process_type())
+    node.set_process_state(ProcessState.RUNNING)
+    node.store()
+    assert BatchSubmission.active_processes() == before + 1
+    node.set_process_state(ProcessState.FINISHED)
+    assert BatchSubmission.active_processes() == before
+
+
+def test_batch_max_active(mock_crystal_code, crystal_calc_parameters, test_ase_structure):
+    from aiida.orm import StructureData
+    from aiida_crystal_dft.workflows.batch import BatchSubmission
+    options = {'resources': {"num_machines": 1, "num_mpiprocs_per_machine": 1}}
+    structures = [StructureData(ase=test_ase_structure[:n]) for n in (2, 4, 8)]
+    batch = BatchSubmission(mock_crystal_code, crystal_calc_parameters, 'STO-3G', options)
+    with pytest.raises(ValueError):
+        batch.submit(structures, max_active=0)
+    # the chunks larger than max_active would never be submitted
+    waits = []
+    batch._wait = lambda max_active, chunk_size, _: waits.append((max_active, chunk_size))
+    batch._submit_one = lambda structure: structure
+    report = batch.submit(structures, chunk_size=100, max_active=2)
+    assert waits == [(2, 2), (2, 1)]
+    assert len(report.submitted) == 3
@@ -0,0 +1,77 @@
+"""Tests for resource policy of base workflow
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def mock_computer():
+    """A computer with a scheduler having 32 processes and 64 GB per machine"""
+    computer = MagicMock()
+    computer.get_default_mpiprocs_per_machine.return_value = 32
+    computer.get_default_memory_per_machine.return_value = 64 * 1024 ** 2
+    return computer
+
+
+def test_ao_number(test_structure_data, test_basis_family_predefined, test_basis_family):
+    from aiida_crystal_dft.workflows.resources import get_ao_number, minimal_ao_number
+    assert minimal_ao_number('H') == 1
+    assert minimal_ao_number('O') == 5
+    assert minimal_ao_number('Mg') == 9
+    assert minimal_ao_number('Fe') == 18
+    # MgO conventional cell
+    assert get_ao_number(test_structure_data, test_basis_family_predefined) == 56
+    # explicit STO-3G basis sets give the same
+    assert get_ao_number(test_structure_data, test_basis_family) == 56
+
+
+def test_ao_number_unknown_predefined(test_structure_data):
+    from aiida_crystal_dft.workflows.resources import DEFAULT_AO_FACTOR, get_ao_number
+    basis_family = MagicMock(predefined=True)
+    basis_family.name = 'POB-QZVP'
+    # the estimate does not abort the submission and errs on the large side
+    assert get_ao_number(test_structure_data, basis_family) == DEFAULT_AO_FACTOR * 56
+
+
+def test_memory_estimate():
+    from aiida_crystal_dft.workflows.resources import BASE_MEMORY_KB, estimate_memory_kb, get_kpoint_number
+    assert get_kpoint_number([8, 8]) == 257
+    memory = estimate_memory_kb(56, 8, [8, 8])
+    assert memory > BASE_MEMORY_KB
+    assert estimate_memory_kb(56, 8, [8, 8], spin=True) > memory
+    assert estimate_memory_kb(112, 16, [8, 8]) - BASE_MEMORY_KB == 4 * (memory - BASE_MEMORY_KB)
+
+
+def test_initial_options(mock_computer):
+    from aiida_crystal_dft.workflows.resources import ResourcePolicy
+    policy = ResourcePolicy(mock_computer, max_machines=8)
+    options = {'resources': {'num_machines': 1}}
+    # small memory: all the processes fit into a machine
+    small = policy.initial_options(options, 1024 ** 2)
+    assert small['resources'] == {'num_machines': 1, 'num_mpiprocs_per_machine': 32}
+    assert small['max_memory_kb'] == 32 * 1.5 * 1024 ** 2
+    assert options == {'resources': {'num_machines': 1}}
+    # 8 GB per process: the processes are spread over 7 machines
+    large = policy.initial_options(options, 8 * 1024 ** 2)
+    assert large['resources'] == {'num_machines': 7, 'num_mpiprocs_per_machine': 5}
+    assert large['max_memory_kb'] == 60 * 1024 ** 2
+    # too large: limited by the maximum number of machines
+    huge = policy.initial_options(options, 64 * 1024 ** 2)
+    assert huge['resources'] == {'num_machines': 8, 'num_mpiprocs_per_machine': 1}
+    assert huge['max_memory_kb'] == 64 * 1024 ** 2
+
+
+def test_scale(mock_computer):
+    from aiida_crystal_dft.workflows.resources import ResourcePolicy
+    policy = ResourcePolicy(mock_computer, max_machines=4)
+    serial = {'resources': {'num_machines': 1, 'num_mpiprocs_per_machine': 1}, 'max_memory_kb': 4 * 1024 ** 2}
+    parallel = policy.scale(serial)
+    assert parallel['resources'] == {'num_machines': 2, 'num_mpiprocs_per_machine': 1}
+    assert parallel['max_memory_kb'] == 8 * 1024 ** 2
+    options = {'resources': {'num_machines': 2, 'num_mpiprocs_per_machine': 16}, 'max_memory_kb': 32 * 1024 ** 2}
+    scaled = policy.scale(options)
+    # the same memory per machine for twice less processes
+    assert scaled['resources'] == {'num_machines': 4, 'num_mpiprocs_per_machine': 8}
+    assert scaled['max_memory_kb'] == 32 * 1024 ** 2
+    assert policy.scale(scaled) is None
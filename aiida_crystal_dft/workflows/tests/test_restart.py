@@ -0,0 +1,65 @@
+"""Tests for restart handlers of base workflow
+"""
+from copy import deepcopy
+
+
+def test_scf_handler():
+    from aiida_crystal_dft.tests import d12_input
+    from aiida_crystal_dft.schemas import validate_with_json
+    from aiida_crystal_dft.workflows.restart import get_handler
+    parameters = deepcopy(d12_input)
+    del parameters['scf']['numerical']['LEVSHIFT']
+    options = {}
+    handler = get_handler(300)
+    handler(parameters, options, 1)
+    assert parameters['scf']['numerical']['MAXCYCLE'] == 100
+    assert parameters['scf']['numerical']['FMIXING'] == 20
+    assert 'LEVSHIFT' not in parameters['scf']['numerical']
+    handler(parameters, options, 2)
+    assert parameters['scf']['numerical']['MAXCYCLE'] == 200
+    assert parameters['scf']['numerical']['FMIXING'] == 40
+    assert parameters['scf']['numerical']['LEVSHIFT'] == [5, 1]
+    assert not options
+    validate_with_json(parameters, name="d12")
+
+
+def test_optimisation_handler():
+    from aiida_crystal_dft.schemas import validate_with_json
+    from aiida_crystal_dft.workflows.restart import get_handler
+    parameters = {"geometry": {"optimise": True}, "scf": {"k_points": [8, 8]}}
+    handler = get_handler(301)
+    handler(parameters, {}, 1)
+    assert parameters["geometry"]["optimise"] == {"convergence": {"MAXCYCLE": 200}}
+    assert "numerical" not in parameters["scf"]
+    handler(parameters, {}, 2)
+    assert parameters["geometry"]["optimise"]["convergence"]["MAXCYCLE"] == 400
+    assert parameters["scf"]["numerical"]["TOLDEE"] == 8
+    validate_with_json(parameters, name="d12")
+
+
+def test_allocation_handler():
+    from aiida_crystal_dft.workflows.restart import get_handler
+    handler = get_handler(350)
+    options = {'resources': {"num_machines": 1, "num_mpiprocs_per_machine": 1}}
+    handler({}, options, 1)
+    assert options['resources']['num_machines'] == 2
+    options['max_memory_kb'] = 1000
+    handler({}, options, 2)
+    assert options['resources']['num_machines'] == 2
+    assert options['max_memory_kb'] == 2000
+
+
+def test_no_handler():
+    from aiida_crystal_dft.workflows.restart import RESTART_HANDLERS, get_handler
+    assert set(RESTART_HANDLERS) == {300, 301, 350}
+    assert get_handler(302) is None
+    assert get_handler(None) is None
+
+
+def test_allocation_handler_calculation():
+    from aiida_crystal_dft.workflows.base import BaseCrystalWorkChain
+    from aiida_crystal_dft.workflows.restart import get_handler
+    options = {'resources': {"num_machines": 1, "num_mpiprocs_per_machine": 1}}
+    assert BaseCrystalWorkChain._get_calculation(options) == BaseCrystalWorkChain._serial_calculation
+    get_handler(350)({}, options, 1)
+    assert BaseCrystalWorkChain._get_calculation(options) == BaseCrystalWorkChain._parallel_calculation